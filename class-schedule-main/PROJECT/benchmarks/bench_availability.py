@@ -0,0 +1,138 @@
+"""
+Benchmark find_available_rooms and suggest_reschedule_options on a large timetable.
+
+Compares the previous per-room implementation (no indexes, one or two queries
+per day x slot x room) with the current set-based queries, which use range
+lookups on the indexed week-minute interval columns.
+
+Usage (from the PROJECT directory):
+    python benchmarks/bench_availability.py --rows 10000 --rooms 80
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from class_scheduler.scheduler import (get_session, find_available_rooms, invalidate_reference_data, occupancy_cache,
+                                       publish_version, slot_columns, suggest_reschedule_options,
+                                       Class, ClassCourseTeacher, Classroom, Course, Teacher, Timetable,
+                                       TimetableVersion)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SLOTS = [(f"{h:02d}:00", f"{h+1:02d}:00") for h in range(0, 24)]
+
+
+# Previous implementations, kept here as the baseline
+def legacy_find_available_rooms(session, day, start_time, end_time):
+    all_rooms = session.query(Classroom).all()
+    occupied = session.query(Timetable.classroom_id).filter_by(day=day, start_time=start_time, end_time=end_time).all()
+    occupied_ids = {r[0] for r in occupied}
+    return [room for room in all_rooms if room.id not in occupied_ids]
+
+
+def legacy_suggest_reschedule_options(session, class_id, course_id, exclude_timetable_id=None):
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    time_slots = [("09:00", "10:00"), ("10:00", "11:00"), ("11:00", "12:00")]
+    class_ = session.get(Class, class_id)
+    cct = next((c for c in class_.course_teachers if c.course_id == course_id), None)
+    if not cct:
+        return []
+    teacher = cct.teacher
+    classrooms = session.query(Classroom).all()
+    suggestions = []
+    for day in days:
+        for slot in time_slots:
+            for classroom in classrooms:
+                q = session.query(Timetable).filter_by(day=day, start_time=slot[0], end_time=slot[1], classroom_id=classroom.id)
+                if exclude_timetable_id:
+                    q = q.filter(Timetable.id != exclude_timetable_id)
+                if q.first():
+                    continue
+                q2 = session.query(Timetable).filter_by(day=day, start_time=slot[0], end_time=slot[1], teacher_id=teacher.id)
+                if exclude_timetable_id:
+                    q2 = q2.filter(Timetable.id != exclude_timetable_id)
+                if q2.first():
+                    continue
+                suggestions.append((day, slot[0], slot[1], classroom.name))
+    return suggestions
+
+
+def populate(session, rows, rooms, teachers, seed):
+    rng = random.Random(seed)
+    session.bulk_insert_mappings(Classroom, [dict(id=i, name=f"Room {i}", capacity=40) for i in range(1, rooms + 1)])
+    session.bulk_insert_mappings(Teacher, [dict(id=i, name=f"Teacher {i}", subject="") for i in range(1, teachers + 1)])
+    session.bulk_insert_mappings(Course, [dict(id=1, name="Course 1")])
+    n_classes = rows // 10 + 1
+    session.bulk_insert_mappings(Class, [dict(id=i, name=f"Class {i}") for i in range(1, n_classes + 1)])
+    session.bulk_insert_mappings(ClassCourseTeacher, [dict(class_id=1, course_id=1, teacher_id=1)])
+    session.add(TimetableVersion(id=1, source='generate'))
+    cells = [(day, slot, room) for day in DAYS for slot in SLOTS for room in range(1, rooms + 1)]
+    entries = []
+    for day, slot, room in rng.sample(cells, min(rows, len(cells))):
+        entries.append(dict(version_id=1, class_id=rng.randint(1, n_classes), classroom_id=room, course_id=1,
+                            teacher_id=rng.randint(1, teachers), **slot_columns(day, slot[0], slot[1])))
+    session.bulk_insert_mappings(Timetable, entries)
+    publish_version(session, 1)
+
+
+def measure(session, label, func, repeat):
+    engine = session.get_bind()
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    elapsed = 0.0
+    for _ in range(repeat):
+        # Every repeat starts cold, so the figures are lookups and not cache hits
+        occupancy_cache.invalidate()
+        invalidate_reference_data()
+        session.expire_all()
+        started = time.perf_counter()
+        result = func()
+        elapsed += time.perf_counter() - started
+    elapsed /= repeat
+    event.remove(engine, 'before_cursor_execute', count)
+    print(f"{label:<48} {statements[0] / repeat:>8.0f} queries {elapsed * 1000:>10.2f} ms  ({len(result)} results)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--rooms', type=int, default=80)
+    parser.add_argument('--teachers', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = get_session(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        populate(session, args.rows, args.rooms, args.teachers, args.seed)
+        print(f"{session.query(Timetable).count()} timetable rows, {args.rooms} rooms\n")
+
+        indexes = list(Timetable.__table__.indexes)
+        for index in indexes:
+            session.execute(text(f"DROP INDEX {index.name}"))
+        session.commit()
+        measure(session, "legacy find_available_rooms (no index)",
+                lambda: legacy_find_available_rooms(session, "Monday", "10:00", "11:00"), args.repeat)
+        measure(session, "legacy suggest_reschedule_options (no index)",
+                lambda: legacy_suggest_reschedule_options(session, 1, 1), args.repeat)
+
+        for index in indexes:
+            index.create(session.get_bind())
+        measure(session, "find_available_rooms",
+                lambda: find_available_rooms(session, "Monday", "10:00", "11:00"), args.repeat)
+        measure(session, "suggest_reschedule_options",
+                lambda: suggest_reschedule_options(session, 1, 1), args.repeat)
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
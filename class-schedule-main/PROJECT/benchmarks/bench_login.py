@@ -0,0 +1,84 @@
+"""
+Benchmark the login path: logins per second per core for each password hash setting.
+
+Each setting is measured on its own temporary database of --users accounts.
+A login is what POST /login does: look the user up by name, check the password
+and, when the configured setting is a stronger one of the same method, rehash
+it. Accounts start with hashes made by `pbkdf2:sha256:100000`, and the first
+pass over the users is timed separately, so for a stronger pbkdf2 setting it
+shows the one-off cost of the upgrade. Later passes are the steady state.
+Everything runs on one thread, so the figures are per core.
+
+Usage (from the PROJECT directory):
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --methods scrypt pbkdf2:sha256:600000 pbkdf2:sha256:200000 --logins 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+from class_scheduler import scheduler
+from class_scheduler.scheduler import get_session, User
+
+PASSWORD = 'correct horse battery staple'
+LEGACY_METHOD = 'pbkdf2:sha256:100000'
+
+
+def login(session, username, password):
+    """The database and hashing work of the /login route."""
+    user = session.query(User).filter_by(username=username).first()
+    if user and user.check_password(password):
+        if user.needs_rehash():
+            user.set_password(password)
+            session.commit()
+        return user.id
+    return None
+
+
+def run(session, names, logins):
+    started = time.perf_counter()
+    for i in range(logins):
+        if login(session, names[i % len(names)], PASSWORD) is None:
+            raise RuntimeError("login failed")
+    return time.perf_counter() - started
+
+
+def bench(tmp, method, args):
+    scheduler.PASSWORD_METHOD = method
+    session = get_session(f"sqlite:///{os.path.join(tmp, method.replace(':', '_'))}.db")
+    # Accounts start with a weaker hash, as if created before the setting
+    legacy = generate_password_hash(PASSWORD, LEGACY_METHOD)
+    names = [f"student{i}" for i in range(args.users)]
+    session.bulk_insert_mappings(User, [dict(username=name, password_hash=legacy) for name in names])
+    session.commit()
+
+    upgrade = run(session, names, len(names))
+    steady = run(session, names, args.logins)
+    session.close()
+    return {'upgrade_ms': upgrade / len(names) * 1000, 'login_ms': steady / args.logins * 1000,
+            'per_core': args.logins / steady}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--methods', nargs='+', default=['scrypt', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:200000'],
+                        help="werkzeug hash methods to compare (default: werkzeug's, OWASP pbkdf2, a cheaper pbkdf2)")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    print(f"{'method':<28} {'first login ms':>15} {'login ms':>10} {'logins/s/core':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for method in args.methods:
+            result = bench(tmp, method, args)
+            print(f"{method:<28} {result['upgrade_ms']:>15.1f} {result['login_ms']:>10.1f} "
+                  f"{result['per_core']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark generate_timetable, suggest_reschedule_options and find_available_rooms on a synthetic institution.
+
+Each function is timed on a seeded institution from synthetic.py. The harness
+reports wall time, SQL statements, peak Python memory (tracemalloc) and, for
+generation, the share of lessons (course periods) that were scheduled. Results can
+be written as JSON and compared with an earlier run to spot regressions.
+
+Usage (from the PROJECT directory):
+    python benchmarks/bench_scheduler.py --classes 200 --courses-per-class 6 --output after.json
+    python benchmarks/bench_scheduler.py --classes 200 --courses-per-class 6 --baseline before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from class_scheduler.scheduler import (get_session, generate_timetable, find_available_rooms, occupancy_cache,
+                                       suggest_reschedule_options, ClassCourseTeacher)
+from synthetic import days_and_slots, populate
+
+
+def measure(session, func, repeat):
+    """Run func repeat times with a cold occupancy cache; keep the fastest run's figures."""
+    engine = session.get_bind()
+    best = None
+    for _ in range(repeat):
+        statements = [0]
+
+        def count(*args):
+            statements[0] += 1
+
+        occupancy_cache.invalidate()
+        session.expire_all()
+        event.listen(engine, 'before_cursor_execute', count)
+        tracemalloc.start()
+        started = time.perf_counter()
+        # The scheduler prints progress; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        event.remove(engine, 'before_cursor_execute', count)
+        if best is None or wall < best['wall_s']:
+            best = {'wall_s': round(wall, 4), 'sql_statements': statements[0], 'peak_kib': round(peak / 1024, 1),
+                    'result': result}
+    return best
+
+
+def run(args):
+    days, slots = days_and_slots(args.days, args.slots)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        session = get_session(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        counts = populate(session, args.classes, args.courses_per_class, args.teachers, args.rooms,
+                          courses=args.courses, seed=args.seed, periods=args.periods)
+
+        for strategy in args.strategies:
+            stats = {}
+
+            def generate():
+                stats.clear()
+                generate_timetable(session, days, slots, strategy=strategy, time_budget=args.time_budget,
+                                   seed=args.seed, stats=stats)
+                return dict(stats)
+
+            entry = measure(session, generate, args.repeat)
+            search = entry.pop('result')
+            total = counts['lessons']
+            entry['scheduled_share'] = round(1 - search['unscheduled'] / total, 4) if total else 1.0
+            entry['unscheduled'] = search['unscheduled']
+            results[f"generate_timetable[{strategy}]"] = entry
+
+        # The lookups run against the timetable of the last strategy
+        lesson = session.query(ClassCourseTeacher.class_id, ClassCourseTeacher.course_id).first()
+        lookups = {
+            'find_available_rooms': lambda: find_available_rooms(session, days[0], slots[0][0], slots[0][1]),
+            'suggest_reschedule_options': lambda: suggest_reschedule_options(session, lesson[0], lesson[1]),
+        }
+        for name, func in lookups.items():
+            entry = measure(session, func, args.repeat)
+            entry['results'] = len(entry.pop('result'))
+            results[name] = entry
+        session.close()
+
+    return {
+        'meta': {
+            'params': dict(vars(args), **counts),
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def print_report(report, baseline=None):
+    previous = (baseline or {}).get('results', {})
+    print(f"{'function':<34} {'wall s':>9} {'SQL':>7} {'peak KiB':>10} {'scheduled':>10}")
+    for name, entry in report['results'].items():
+        share = entry.get('scheduled_share')
+        line = (f"{name:<34} {entry['wall_s']:>9.3f} {entry['sql_statements']:>7} {entry['peak_kib']:>10.0f} "
+                f"{'' if share is None else f'{share:.1%}':>10}")
+        old = previous.get(name)
+        if old and old['wall_s']:
+            line += f"   wall {(entry['wall_s'] - old['wall_s']) / old['wall_s']:+.0%}"
+            line += f", SQL {entry['sql_statements'] - old['sql_statements']:+d}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--classes', type=int, default=50)
+    parser.add_argument('--courses-per-class', type=int, default=5)
+    parser.add_argument('--courses', type=int, default=None, help="size of the course catalogue")
+    parser.add_argument('--periods', type=int, default=1, help="lessons per week of every course")
+    parser.add_argument('--teachers', type=int, default=40)
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--strategies', nargs='+', default=['greedy', 'solver'])
+    parser.add_argument('--time-budget', type=float, default=5.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fileobj:
+            baseline = json.load(fileobj)
+    report = run(args)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as fileobj:
+            json.dump(report, fileobj, indent=2)
+
+
+if __name__ == '__main__':
+    main()
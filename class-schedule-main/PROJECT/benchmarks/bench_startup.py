@@ -0,0 +1,81 @@
+"""
+Benchmark cold-start time of the `schedule` command against a time budget.
+
+Each case runs in a fresh Python process, --repeat times, and the median wall
+time is reported. The cases are: bare interpreter start-up (for reference),
+`schedule --help` (no scheduler import), importing the scheduler, and a room lookup
+on a seeded database, both with the schema fingerprint current and with the
+full schema check forced. The room lookup is what a cron script pays. The
+run fails (exit status 1) when its median exceeds --budget-ms.
+
+Usage (from the PROJECT directory):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 400 --repeat 15
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT)
+
+
+def median_ms(command, repeat, before=None):
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="budget for a room lookup (default 1000)")
+    parser.add_argument('--repeat', type=int, default=9)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'startup.db')
+        db = f"sqlite:///{path}"
+        # Seed in a child process, so this one stays cold as well
+        subprocess.run([sys.executable, '-c', (
+            "import sys; sys.path.insert(0, 'benchmarks'); from class_scheduler.scheduler import get_session; "
+            "from synthetic import populate; populate(get_session(sys.argv[1]), 50, 5, 40, 20, seed=1)"
+        ), db], cwd=PROJECT, check=True)
+        subprocess.run([sys.executable, '-m', 'class_scheduler', 'generate', '--db', db], cwd=PROJECT, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        def forget_schema():
+            connection = sqlite3.connect(path)
+            connection.execute("PRAGMA user_version = 0")
+            connection.commit()
+            connection.close()
+
+        lookup = [sys.executable, '-m', 'class_scheduler', 'find-rooms', 'Monday', '09:00', '10:00', '--db', db]
+        cases = [
+            ('python -c pass', [sys.executable, '-c', 'pass'], None),
+            ('schedule --help', [sys.executable, '-m', 'class_scheduler', '--help'], None),
+            ('import scheduler', [sys.executable, '-c', 'import class_scheduler.scheduler'], None),
+            ('schedule find-rooms', lookup, None),
+            ('schedule find-rooms (schema check)', lookup, forget_schema),
+        ]
+        results = {name: median_ms(command, args.repeat, before) for name, command, before in cases}
+
+    for name, elapsed in results.items():
+        print(f"{name:<36} {elapsed:>9.1f} ms")
+    lookup_ms = results['schedule find-rooms']
+    verdict = 'within' if lookup_ms <= args.budget_ms else 'OVER'
+    print(f"\nRoom lookup {lookup_ms:.0f} ms, {verdict} the {args.budget_ms:.0f} ms budget")
+    return 0 if lookup_ms <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Seeded synthetic institutions for the benchmarks.
+
+populate(session, ...) fills an empty database with rooms, courses, teachers,
+class groups with their sizes and class -> course -> teacher assignments. The same
+arguments and seed always produce the same data. Nothing is scheduled; run
+generate_timetable afterwards.
+"""
+import random
+
+from class_scheduler.scheduler import DAY_NAMES, Class, ClassCourseTeacher, Classroom, Course, Teacher
+
+
+def days_and_slots(days, slots, first_hour=8):
+    """The first `days` weekdays and `slots` consecutive one-hour slots from first_hour."""
+    return DAY_NAMES[:days], [(f"{h:02d}:00", f"{h + 1:02d}:00") for h in range(first_hour, first_hour + slots)]
+
+
+def populate(session, classes, courses_per_class, teachers, rooms, courses=None, seed=0, periods=1):
+    """
+    Insert a synthetic institution with bulk inserts and return a dict of the
+    row counts. By default there are twice as many courses as each class takes.
+    Every course has at least one qualified teacher, and each class gets
+    courses_per_class distinct courses with one of their teachers, each taught
+    `periods` times a week.
+    """
+    rng = random.Random(seed)
+    courses = courses or max(courses_per_class * 2, 1)
+    courses_per_class = min(courses_per_class, courses)
+
+    capacities = [rng.randrange(20, 61, 5) for _ in range(rooms)]
+    # The last room holds the largest class (55), so every class fits somewhere
+    if capacities:
+        capacities[-1] = 60
+    session.bulk_insert_mappings(Classroom, [
+        dict(id=i, name=f"Room {i}", capacity=capacity) for i, capacity in enumerate(capacities, 1)])
+    session.bulk_insert_mappings(Course, [dict(id=i, name=f"Course {i}") for i in range(1, courses + 1)])
+    # Teacher t teaches course t mod courses; with fewer teachers than
+    # courses, some teachers take several
+    qualified = {c: [t for t in range(1, teachers + 1) if (t - 1) % courses == c - 1] or [(c - 1) % teachers + 1]
+                 for c in range(1, courses + 1)}
+    subjects = {}
+    for course_id, teacher_ids in qualified.items():
+        for teacher_id in teacher_ids:
+            subjects.setdefault(teacher_id, []).append(f"Course {course_id}")
+    session.bulk_insert_mappings(Teacher, [
+        dict(id=i, name=f"Teacher {i}", subject=", ".join(subjects.get(i, []))) for i in range(1, teachers + 1)])
+    # Class sizes stay within the largest room (see the capacities above)
+    session.bulk_insert_mappings(Class, [
+        dict(id=i, name=f"Class {i}", size=rng.randrange(15, 56, 5)) for i in range(1, classes + 1)])
+
+    assignments = []
+    for class_id in range(1, classes + 1):
+        for course_id in rng.sample(range(1, courses + 1), courses_per_class):
+            assignments.append(dict(class_id=class_id, course_id=course_id,
+                                    teacher_id=rng.choice(qualified[course_id]), periods_per_week=periods))
+    session.bulk_insert_mappings(ClassCourseTeacher, assignments)
+    session.commit()
+    return {'classes': classes, 'courses': courses, 'teachers': teachers, 'rooms': rooms,
+            'assignments': len(assignments), 'lessons': len(assignments) * periods}
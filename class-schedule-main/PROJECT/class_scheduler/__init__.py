@@ -0,0 +1,7 @@
+"""
+Class timetable scheduler: the scheduling core (scheduler, solver, occupancy),
+CSV import and export, the generation queue, the `schedule` command (cli) and
+the Flask web app (webapp.app).
+
+Nothing is imported here, so `schedule --help` does not load SQLAlchemy.
+"""
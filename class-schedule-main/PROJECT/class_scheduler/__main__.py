@@ -0,0 +1,6 @@
+"""`python -m class_scheduler` runs the `schedule` command."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
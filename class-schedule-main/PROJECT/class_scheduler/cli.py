@@ -0,0 +1,116 @@
+"""
+The `schedule` command: generate the timetable, look up free rooms and
+reschedule options, and export the timetable, without the web app.
+
+Installed with `pip install -e .` (see pyproject.toml), or run as
+`python -m class_scheduler` from the PROJECT directory:
+    schedule generate --strategy solver --time-budget 10
+    schedule find-rooms Monday 10:00 11:00 --min-capacity 30
+    schedule suggest 3 7
+    schedule export ics alice.ics --teacher-id 3 --start 2025-09-01
+
+The scheduler (and with it SQLAlchemy) is imported only by the command that
+runs, so `schedule --help` and argument errors return at once, and the
+database schema is checked only when a command opens the database.
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_DB = os.environ.get('SCHEDULER_DATABASE_URL', 'sqlite:///scheduler.db')
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+def _hourly_slots(first, last):
+    return [(f"{h:02d}:00", f"{h + 1:02d}:00") for h in range(first, last)]
+
+
+def generate(args):
+    from .scheduler import generate_timetable, get_session
+    session = get_session(args.db)
+    stats = {}
+    summary = generate_timetable(session, args.days, _hourly_slots(*args.hours), strategy=args.strategy,
+                                 time_budget=args.time_budget, seed=args.seed, stats=stats, starts=args.starts,
+                                 workers=args.workers, incremental=args.incremental, publish=not args.review)
+    if args.verbose:
+        for line in summary:
+            print(line)
+    state = 'saved for review' if args.review else 'published'
+    print(f"Version {stats['version_id']} {state}: {len(summary) - stats['unscheduled']} lessons placed, "
+          f"{stats['unscheduled']} unscheduled, score {stats['score']}, {stats['elapsed']:.2f}s.")
+    session.close()
+    return 0
+
+
+def find_rooms(args):
+    from .scheduler import find_available_rooms, get_session
+    session = get_session(args.db)
+    rooms = find_available_rooms(session, args.day, args.start, args.end, date=args.date,
+                                 min_capacity=args.min_capacity)
+    for room in rooms:
+        print(f"{room.id}\t{room.name}\t{room.capacity}")
+    session.close()
+    return 0
+
+
+def suggest(args):
+    from .scheduler import get_session, suggest_reschedule_options
+    session = get_session(args.db)
+    for day, start, end, room in suggest_reschedule_options(session, args.class_id, args.course_id, args.exclude):
+        print(f"{day}\t{start}-{end}\t{room}")
+    session.close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='schedule', description="Class scheduler command line.")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    command = commands.add_parser('generate', help="generate a new timetable version")
+    command.add_argument('--strategy', choices=['greedy', 'solver'], default='greedy')
+    command.add_argument('--time-budget', type=float, help="seconds for the solver strategy")
+    command.add_argument('--seed', type=int)
+    command.add_argument('--starts', type=int, default=1, help="parallel shuffled searches; the best is kept")
+    command.add_argument('--workers', type=int)
+    command.add_argument('--incremental', action='store_true', help="keep the published entries where they are")
+    command.add_argument('--review', action='store_true', help="save the version without publishing it")
+    command.add_argument('--days', nargs='+', default=DAYS)
+    command.add_argument('--hours', nargs=2, type=int, default=(8, 18), metavar=('FIRST', 'LAST'),
+                         help="hourly slots from FIRST:00 to LAST:00 (default 8 18)")
+    command.add_argument('--verbose', '-v', action='store_true', help="print every lesson")
+    command.set_defaults(func=generate)
+
+    command = commands.add_parser('find-rooms', help="list the free rooms in a time slot")
+    command.add_argument('day')
+    command.add_argument('start', help="HH:MM")
+    command.add_argument('end', help="HH:MM")
+    command.add_argument('--date', help="YYYY-MM-DD, to apply that date's cancellations and room changes")
+    command.add_argument('--min-capacity', type=int)
+    command.set_defaults(func=find_rooms)
+
+    command = commands.add_parser('suggest', help="suggest free slots and rooms for a class's course")
+    command.add_argument('class_id', type=int)
+    command.add_argument('course_id', type=int)
+    command.add_argument('--exclude', type=int, help="timetable entry being moved")
+    command.set_defaults(func=suggest)
+
+    for command in commands.choices.values():
+        command.add_argument('--db', default=DEFAULT_DB, help="database URL (default: %(default)s)")
+
+    # Handled by exporters.main, see main()
+    commands.add_parser('export', help="export the timetable as CSV, NDJSON or ICS (see export --help)",
+                        add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'export':
+        from .exporters import main as export_main
+        return export_main(argv[1:], prog='schedule export')
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
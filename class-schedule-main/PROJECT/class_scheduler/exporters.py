@@ -0,0 +1,163 @@
+"""
+Streaming timetable export as CSV, NDJSON or an iCalendar (ICS) feed.
+
+timetable_rows() reads the Timetable entries of the published version (or of
+any other version) joined to their class, course, teacher and room names in
+batches with yield_per, and the formatters turn
+them into text chunks one batch at a time. Memory use stays flat however large
+the timetable is: the web app streams the chunks as a chunked response, the
+command line writes them to a file.
+
+ICS exports contain one weekly recurring event per entry, starting in the
+week of the given term start date.
+
+Command line (from the PROJECT directory):
+    python -m class_scheduler.exporters csv timetable.csv
+    python -m class_scheduler.exporters ics alice.ics --teacher-id 3 --start 2025-09-01
+    python -m class_scheduler.exporters csv draft.csv --version 12
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+
+from .scheduler import DAY_NAMES, get_session, live, Class, Classroom, Course, Teacher, Timetable
+
+DEFAULT_BATCH_SIZE = 1000
+FIELDS = ('id', 'class', 'course', 'teacher', 'classroom', 'day', 'start_time', 'end_time')
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'ics': 'text/calendar'}
+
+
+def timetable_rows(session, class_id=None, teacher_id=None, batch_size=DEFAULT_BATCH_SIZE, version_id=None):
+    """
+    Timetable entries with names, in week order, fetched batch_size rows at a
+    time. Entries of the published version unless version_id is given.
+    """
+    query = (
+        session.query(
+            Timetable.id, Class.name.label('class'), Course.name.label('course'), Teacher.name.label('teacher'),
+            Classroom.name.label('classroom'), Timetable.day, Timetable.start_time, Timetable.end_time,
+        )
+        .outerjoin(Class, Timetable.class_id == Class.id)
+        .outerjoin(Course, Timetable.course_id == Course.id)
+        .outerjoin(Teacher, Timetable.teacher_id == Teacher.id)
+        .outerjoin(Classroom, Timetable.classroom_id == Classroom.id)
+        .filter(live() if version_id is None else Timetable.version_id == version_id)
+    )
+    if class_id is not None:
+        query = query.filter(Timetable.class_id == class_id)
+    if teacher_id is not None:
+        query = query.filter(Timetable.teacher_id == teacher_id)
+    return query.order_by(Timetable.week_start, Timetable.id).yield_per(batch_size)
+
+
+def _chunks(lines, size=DEFAULT_BATCH_SIZE):
+    """Join lines into text chunks of up to `size` lines."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row))) + '\n'
+
+
+def _ics_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_property(name, value):
+    """One content line, folded at 75 characters as RFC 5545 asks."""
+    line = f"{name}:{value}"
+    return '\r\n '.join(line[i:i + 74] for i in range(0, len(line), 74)) + '\r\n'
+
+
+def _ics_lines(rows, start=None, name='Timetable'):
+    start = start or datetime.date.today()
+    monday = start - datetime.timedelta(days=start.weekday())
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield ('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Class Scheduler//Timetable export//EN\r\n'
+           + _ics_property('X-WR-CALNAME', _ics_text(name)))
+    for row in rows:
+        if row.day not in DAY_NAMES:
+            continue
+        date = monday + datetime.timedelta(days=DAY_NAMES.index(row.day))
+        if date < start:
+            date += datetime.timedelta(days=7)
+        day = date.strftime('%Y%m%d')
+        yield ''.join([
+            'BEGIN:VEVENT\r\n',
+            _ics_property('UID', f'timetable-{row.id}@class-scheduler'),
+            _ics_property('DTSTAMP', stamp),
+            _ics_property('DTSTART', f"{day}T{row.start_time.replace(':', '')}00"),
+            _ics_property('DTEND', f"{day}T{row.end_time.replace(':', '')}00"),
+            'RRULE:FREQ=WEEKLY\r\n',
+            _ics_property('SUMMARY', _ics_text(f"{row.course} ({row._mapping['class']})")),
+            _ics_property('LOCATION', _ics_text(row.classroom)),
+            _ics_property('DESCRIPTION', _ics_text(f"Teacher: {row.teacher}")),
+            'END:VEVENT\r\n',
+        ])
+    yield 'END:VCALENDAR\r\n'
+
+
+def export(rows, fmt, start=None, name='Timetable', batch_size=DEFAULT_BATCH_SIZE):
+    """Text chunks of rows from timetable_rows() in fmt ('csv', 'ndjson' or 'ics')."""
+    if fmt == 'csv':
+        lines = _csv_lines(rows)
+    elif fmt == 'ndjson':
+        lines = _ndjson_lines(rows)
+    elif fmt == 'ics':
+        lines = _ics_lines(rows, start, name)
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+    return _chunks(lines, batch_size)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Export the timetable as CSV, NDJSON or ICS.")
+    parser.add_argument('format', choices=sorted(MIMETYPES))
+    parser.add_argument('output', help="output file, or - for standard output")
+    parser.add_argument('--class-id', type=int)
+    parser.add_argument('--teacher-id', type=int)
+    parser.add_argument('--version', type=int, help="timetable version (default: the published one)")
+    parser.add_argument('--start', type=datetime.date.fromisoformat, help="term start date for ICS (YYYY-MM-DD)")
+    parser.add_argument('--db', default=os.environ.get('SCHEDULER_DATABASE_URL', 'sqlite:///scheduler.db'),
+                        help="database URL (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    session = get_session(args.db)
+    rows = timetable_rows(session, args.class_id, args.teacher_id, args.batch_size, args.version)
+    chunks = export(rows, args.format, args.start, batch_size=args.batch_size)
+    if args.output == '-':
+        sys.stdout.writelines(chunks)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as fileobj:
+            fileobj.writelines(chunks)
+    session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
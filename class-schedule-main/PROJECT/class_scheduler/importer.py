@@ -0,0 +1,282 @@
+"""
+Streaming CSV import for classrooms, teachers, courses, class groups and the
+class -> course -> teacher curriculum.
+
+Rows are read with csv.DictReader and processed in chunks. Each chunk is
+validated, de-duplicated against the names already in the database with one
+query, and written with a single bulk insert and commit. Bad or duplicate rows
+are skipped and listed in the returned ImportReport instead of aborting the
+import halfway through.
+
+Curriculum rows (class, course, teacher and optionally periods per week) are
+resolved to ids with lookup dicts built from one query per table and upserted
+against the _class_course_uc constraint: new pairs are inserted, pairs with a
+different teacher or period count updated.
+
+Command line (from the PROJECT directory):
+    python -m class_scheduler.importer teachers teachers.csv
+    python -m class_scheduler.importer assignments curriculum.csv
+"""
+import argparse
+import csv
+import os
+import sys
+
+from sqlalchemy.exc import IntegrityError
+
+from .scheduler import get_session, invalidate_reference_data, Class, ClassCourseTeacher, Classroom, Course, Teacher
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.errors = []  # (line number, message)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self):
+        text = f"Imported {self.inserted} rows"
+        if self.updated:
+            text += f", updated {self.updated}"
+        if self.errors:
+            text += f", skipped {len(self.errors)}"
+        return text
+
+    def __repr__(self):
+        return f"<ImportReport(inserted={self.inserted}, errors={len(self.errors)})>"
+
+
+def _field(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value is not None and value.strip():
+            return value.strip()
+    return None
+
+
+def _count(row, label, *names):
+    """Optional positive integer column, or None when it is empty."""
+    value = _field(row, *names)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"invalid {label} {value!r}")
+    if value < 1:
+        raise ValueError(f"invalid {label} {value!r}")
+    return value
+
+
+# Parsers accept the same column names as the web upload forms
+def parse_classroom(row):
+    name = _field(row, 'name', 'Classroom Name')
+    capacity = _field(row, 'capacity', 'Capacity')
+    if not name or not capacity:
+        raise ValueError("name and capacity are required")
+    try:
+        capacity = int(capacity)
+    except ValueError:
+        raise ValueError(f"invalid capacity {capacity!r}")
+    return {'name': name, 'capacity': capacity}
+
+
+def parse_teacher(row):
+    name = _field(row, 'name', 'Teacher Name')
+    subject = _field(row, 'subject', 'Courses')
+    if not name or not subject:
+        raise ValueError("name and subject are required")
+    return {'name': name, 'subject': subject,
+            'max_daily_periods': _count(row, 'daily limit', 'max_daily_periods', 'Max Daily Periods'),
+            'max_weekly_periods': _count(row, 'weekly limit', 'max_weekly_periods', 'Max Weekly Periods')}
+
+
+def parse_course(row):
+    name = _field(row, 'name', 'Course Name')
+    if not name:
+        raise ValueError("name is required")
+    return {'name': name}
+
+
+def parse_class(row):
+    name = _field(row, 'name', 'Class Group Name')
+    if not name:
+        raise ValueError("name is required")
+    return {'name': name, 'size': _count(row, 'size', 'size', 'Size', 'Students')}
+
+
+def parse_assignment(row):
+    class_name = _field(row, 'class', 'name', 'Class Group Name')
+    course_name = _field(row, 'course', 'Course Name')
+    teacher_name = _field(row, 'teacher', 'Teacher Name')
+    if not class_name or not course_name or not teacher_name:
+        raise ValueError("class, course and teacher are required")
+    periods = _count(row, 'periods', 'periods', 'periods_per_week', 'Periods per Week') or 1
+    return class_name, course_name, teacher_name, periods
+
+
+IMPORTERS = {
+    'classrooms': (Classroom, parse_classroom),
+    'teachers': (Teacher, parse_teacher),
+    'courses': (Course, parse_course),
+    'classes': (Class, parse_class),
+}
+
+
+def _chunks(numbered_rows, size):
+    chunk = []
+    for item in numbered_rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_rows(session, model, parse, numbered_rows, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """
+    Import (line number, row dict) pairs into a model with a unique ``name``.
+    Every chunk is committed on its own, so a bad row never undoes earlier chunks.
+    """
+    report = report or ImportReport()
+    seen = set()  # names already taken earlier in this file
+    for chunk in _chunks(numbered_rows, chunk_size):
+        parsed = []
+        for line, row in chunk:
+            try:
+                mapping = parse(row)
+            except ValueError as exc:
+                report.error(line, str(exc))
+                continue
+            if mapping['name'] in seen:
+                report.error(line, f"duplicate name {mapping['name']!r} in file")
+                continue
+            seen.add(mapping['name'])
+            parsed.append((line, mapping))
+
+        names = [mapping['name'] for _, mapping in parsed]
+        existing = {name for (name,) in session.query(model.name).filter(model.name.in_(names))} if names else set()
+        mappings = []
+        for line, mapping in parsed:
+            if mapping['name'] in existing:
+                report.error(line, f"{mapping['name']!r} already exists")
+            else:
+                mappings.append(mapping)
+        if not mappings:
+            continue
+        try:
+            session.bulk_insert_mappings(model, mappings)
+            session.commit()
+            invalidate_reference_data()
+            report.inserted += len(mappings)
+        except IntegrityError as exc:
+            session.rollback()
+            report.error(parsed[0][0], f"chunk rejected by the database: {exc.orig}")
+    report.errors.sort()
+    return report
+
+
+def import_assignments(session, numbered_rows, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """
+    Import (line number, row dict) pairs of class, course and teacher names.
+    Unknown class groups are created; unknown courses or teachers are reported.
+    Each chunk is one transaction.
+    """
+    report = report or ImportReport()
+    classes = dict(session.query(Class.name, Class.id))
+    courses = dict(session.query(Course.name, Course.id))
+    teachers = dict(session.query(Teacher.name, Teacher.id))
+    existing = {(row.class_id, row.course_id): (row.id, row.teacher_id, row.periods_per_week or 1)
+                for row in session.query(ClassCourseTeacher.id, ClassCourseTeacher.class_id, ClassCourseTeacher.course_id,
+                                         ClassCourseTeacher.teacher_id, ClassCourseTeacher.periods_per_week)}
+    seen = set()  # (class, course) pairs already given earlier in this file
+
+    for chunk in _chunks(numbered_rows, chunk_size):
+        parsed = []
+        for line, row in chunk:
+            try:
+                class_name, course_name, teacher_name, periods = parse_assignment(row)
+            except ValueError as exc:
+                report.error(line, str(exc))
+                continue
+            if course_name not in courses:
+                report.error(line, f"unknown course {course_name!r}")
+            elif teacher_name not in teachers:
+                report.error(line, f"unknown teacher {teacher_name!r}")
+            elif (class_name, course_name) in seen:
+                report.error(line, f"{class_name!r} / {course_name!r} repeated in file")
+            else:
+                seen.add((class_name, course_name))
+                parsed.append((class_name, courses[course_name], teachers[teacher_name], periods))
+
+        new_classes = sorted({class_name for class_name, _, _, _ in parsed if class_name not in classes})
+        inserts, updates = [], []
+        try:
+            if new_classes:
+                session.bulk_insert_mappings(Class, [{'name': name} for name in new_classes])
+                classes.update(session.query(Class.name, Class.id).filter(Class.name.in_(new_classes)))
+            for class_name, course_id, teacher_id, periods in parsed:
+                key = (classes[class_name], course_id)
+                if key not in existing:
+                    inserts.append({'class_id': key[0], 'course_id': course_id, 'teacher_id': teacher_id,
+                                    'periods_per_week': periods})
+                elif existing[key][1:] != (teacher_id, periods):
+                    updates.append({'id': existing[key][0], 'teacher_id': teacher_id, 'periods_per_week': periods})
+            session.bulk_insert_mappings(ClassCourseTeacher, inserts)
+            session.bulk_update_mappings(ClassCourseTeacher, updates)
+            session.commit()
+            if new_classes:
+                invalidate_reference_data()
+        except IntegrityError as exc:
+            session.rollback()
+            for name in new_classes:
+                classes.pop(name, None)
+            report.error(chunk[0][0], f"chunk rejected by the database: {exc.orig}")
+            continue
+        report.inserted += len(inserts)
+        report.updated += len(updates)
+    report.errors.sort()
+    return report
+
+
+def import_csv(session, kind, fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Import a CSV text stream of the given kind (see IMPORTERS, or 'assignments').
+    A class group file that also has course and teacher columns is imported as
+    assignments. Returns an ImportReport.
+    """
+    reader = csv.DictReader(fileobj)
+    numbered = ((reader.line_num, row) for row in reader)
+    if kind == 'classes' and {'course', 'teacher'} <= set(reader.fieldnames or ()):
+        kind = 'assignments'
+    if kind == 'assignments':
+        return import_assignments(session, numbered, chunk_size)
+    model, parse = IMPORTERS[kind]
+    return import_rows(session, model, parse, numbered, chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import CSV data into the scheduler database.")
+    parser.add_argument('kind', choices=sorted(IMPORTERS) + ['assignments'])
+    parser.add_argument('csv_file')
+    parser.add_argument('--db', default=os.environ.get('SCHEDULER_DATABASE_URL', 'sqlite:///scheduler.db'),
+                        help="database URL (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    session = get_session(args.db)
+    with open(args.csv_file, newline='', encoding='utf-8-sig') as fileobj:
+        report = import_csv(session, args.kind, fileobj, args.chunk_size)
+    print(report.summary())
+    for line, message in report.errors:
+        print(f"  line {line}: {message}")
+    return 1 if report.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Opt-in instrumentation: SQL statement counts and timings, phase timers and a
+Prometheus text rendering of what was collected.
+
+Nothing is recorded until enable() is called (the web app does so when
+SCHEDULER_INSTRUMENTATION=1). After that:
+
+- track_sql(engine) counts and times every statement run on the engine and
+  charges it to the open scopes (a web request, a generate_timetable call)
+  or, outside any scope, to scope="none".
+- phase(name) times a block, e.g. the load, search and persist phases of
+  generate_timetable, and adds it to the innermost scope.
+- render_metrics() returns the process totals in Prometheus text format.
+
+Scopes live in a context variable, so concurrent requests and the background
+generation thread are measured separately.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+enabled = False
+
+METRICS = {
+    # name -> (type, help)
+    'scheduler_scope_total': ('counter', 'Completed scopes (requests, timetable generations).'),
+    'scheduler_scope_seconds_total': ('counter', 'Wall time spent in scopes.'),
+    'scheduler_sql_statements_total': ('counter', 'SQL statements executed, by enclosing scope.'),
+    'scheduler_sql_seconds_total': ('counter', 'Time spent executing SQL statements, by enclosing scope.'),
+    'scheduler_phase_total': ('counter', 'Completed scheduler phases.'),
+    'scheduler_phase_seconds_total': ('counter', 'Wall time spent in scheduler phases.'),
+}
+
+_lock = threading.Lock()
+_values = {}  # (metric name, sorted label items) -> value
+_current = contextvars.ContextVar('instrumentation_scope', default=None)
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def _add(name, labels, value=1):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+class Scope:
+    """Statements, SQL time and phase times of one unit of work; see scope()."""
+
+    def __init__(self, name):
+        self.name = name
+        self.parent = None
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.phases = {}
+        self.started = None
+        self.elapsed = None
+        self._token = None
+
+    def start(self):
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        _current.reset(self._token)
+        labels = {'scope': self.name}
+        _add('scheduler_scope_total', labels)
+        _add('scheduler_scope_seconds_total', labels, self.elapsed)
+        _add('scheduler_sql_statements_total', labels, self.statements)
+        _add('scheduler_sql_seconds_total', labels, self.sql_seconds)
+
+    def as_dict(self):
+        return {'sql_statements': self.statements, 'sql_seconds': round(self.sql_seconds, 4),
+                'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()}}
+
+
+def current_scope():
+    return _current.get()
+
+
+@contextmanager
+def scope(name):
+    """Measure the enclosed block as scope `name`; yields the Scope, or None when disabled."""
+    if not enabled:
+        yield None
+        return
+    measured = Scope(name).start()
+    try:
+        yield measured
+    finally:
+        measured.finish()
+
+
+def scoped(name):
+    """Decorator form of scope()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with scope(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def phase(name):
+    if not enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        current = _current.get()
+        if current is not None:
+            current.phases[name] = current.phases.get(name, 0.0) + elapsed
+        _add('scheduler_phase_total', {'phase': name})
+        _add('scheduler_phase_seconds_total', {'phase': name}, elapsed)
+
+
+# The start time lives on the execution context, which is dropped with the
+# statement: after_cursor_execute does not run when a statement fails, and a
+# start time kept on the pooled connection would outlive it
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_instrumentation_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    current = _current.get()
+    if current is None:
+        _add('scheduler_sql_statements_total', {'scope': 'none'})
+        _add('scheduler_sql_seconds_total', {'scope': 'none'}, elapsed)
+    # A statement counts towards every open scope, e.g. a request and the
+    # generate_timetable call inside it
+    while current is not None:
+        current.statements += 1
+        current.sql_seconds += elapsed
+        current = current.parent
+
+
+def track_sql(engine):
+    """Count and time the statements run on engine (once per engine)."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def render_metrics(extra=()):
+    """
+    Prometheus text exposition of the collected metrics. extra is an iterable
+    of (name, type, help, value) for values owned by the caller, such as the
+    occupancy cache statistics.
+    """
+    with _lock:
+        values = sorted(_values.items())
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        samples = [(labels, value) for (metric, labels), value in values if metric == name]
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    for name, kind, help_text, value in extra:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
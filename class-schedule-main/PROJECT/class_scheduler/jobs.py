@@ -0,0 +1,244 @@
+"""
+Single-writer queue for timetable generation.
+
+Submissions are rows of the generation_jobs table, so the queue survives
+restarts and is shared by every web process using the same database. Each
+process runs one worker thread (JobQueue.start()) that claims the oldest queued
+job and runs generate_timetable for it. Two partial unique indexes on the table
+keep this safe without any locking in Python:
+
+- at most one queued or running job per set of options, so an identical
+  submission returns the pending job instead of queueing a second run
+- at most one running job overall, so only one worker (in any process) writes
+  the timetable at a time
+
+A running job records its progress (phase, lessons placed, conflicts) and a
+heartbeat, written every HEARTBEAT_INTERVAL seconds by a timer thread while the
+job runs; events() turns the progress into a Server-Sent Events stream. A running job
+whose heartbeat is older than STALE_AFTER seconds is taken to have lost its
+worker and is marked failed, so the queue moves on.
+"""
+import datetime
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from .scheduler import generate_timetable, get_sessionmaker, GenerationJob
+
+POLL_INTERVAL = 2.0       # seconds between queue checks of an idle worker
+PROGRESS_INTERVAL = 0.5   # minimum seconds between progress writes
+HEARTBEAT_INTERVAL = 30   # seconds between heartbeats of a running job
+STALE_AFTER = 600         # seconds without a heartbeat before a running job is given up
+FINISHED_STATES = ('done', 'failed')
+
+logger = logging.getLogger(__name__)
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def _isoformat(value):
+    return value.isoformat(timespec='seconds') if value else None
+
+
+def job_dict(job):
+    """JSON-ready view of a GenerationJob row."""
+    return {
+        'id': job.id,
+        'state': job.state,
+        'options': json.loads(job.options),
+        'progress': json.loads(job.progress) if job.progress else None,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'submitted_at': _isoformat(job.submitted_at),
+        'started_at': _isoformat(job.started_at),
+        'finished_at': _isoformat(job.finished_at),
+    }
+
+
+class JobQueue:
+    def __init__(self, db_url, days, time_slots):
+        self.db_url = db_url
+        self.days = days
+        self.time_slots = time_slots
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def _session(self):
+        # Looked up per call, so creating a queue does not open the database
+        return get_sessionmaker(self.db_url)()
+
+    # Submitting and reading --------------------------------------------------
+
+    def submit(self, options, user_id=None):
+        """
+        Queue a generate_timetable run with the given keyword options. Returns
+        (job dict, created); created is False when an identical job is already
+        queued or running, and that job is returned instead.
+        """
+        options_key = json.dumps(options, sort_keys=True)
+        session = self._session()
+        try:
+            job = GenerationJob(options=options_key, options_key=options_key, state='queued', submitted_by=user_id)
+            session.add(job)
+            try:
+                session.commit()
+                created = True
+            except IntegrityError:
+                session.rollback()
+                job = session.query(GenerationJob).filter(
+                    GenerationJob.options_key == options_key, GenerationJob.state.in_(('queued', 'running')),
+                ).first()
+                created = False
+                if job is None:  # finished in the meantime
+                    return self.submit(options, user_id)
+            self._wakeup.set()
+            return job_dict(job), created
+        finally:
+            session.close()
+
+    def get(self, job_id):
+        session = self._session()
+        try:
+            job = session.get(GenerationJob, job_id)
+            return job_dict(job) if job else None
+        finally:
+            session.close()
+
+    def latest(self):
+        """The running job, else the oldest queued one, else the last finished one; None if there are none."""
+        session = self._session()
+        try:
+            job = (session.query(GenerationJob).filter(GenerationJob.state == 'running').first()
+                   or session.query(GenerationJob).filter(GenerationJob.state == 'queued')
+                   .order_by(GenerationJob.id).first()
+                   or session.query(GenerationJob).order_by(GenerationJob.id.desc()).first())
+            return job_dict(job) if job else None
+        finally:
+            session.close()
+
+    def events(self, job_id, interval=PROGRESS_INTERVAL):
+        """
+        Server-Sent Events for a job: one 'data:' event with the job dict each
+        time it changes, ending after the job has finished. A comment line is
+        sent while nothing changes so proxies keep the connection open.
+        """
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                yield 'event: missing\ndata: {}\n\n'
+                return
+            payload = json.dumps(job)
+            if payload != last:
+                yield f'data: {payload}\n\n'
+                last = payload
+            else:
+                yield ': waiting\n\n'
+            if job['state'] in FINISHED_STATES:
+                return
+            time.sleep(interval)
+
+    # Worker ------------------------------------------------------------------
+
+    def start(self):
+        """Start this process's worker thread (once)."""
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name='generation-worker', daemon=True)
+                self._worker.start()
+
+    def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job_id = self._claim()
+                if job_id is not None:
+                    self._run(job_id)
+                    continue
+            except Exception:
+                # e.g. the database is locked; try again after the poll interval
+                logger.exception("Generation worker failed to claim or run a job")
+            self._wakeup.wait(POLL_INTERVAL)
+
+    def _claim(self):
+        """Mark the oldest queued job as running and return its id; None if there is none or one is running."""
+        session = self._session()
+        try:
+            now = _now()
+            session.query(GenerationJob).filter(
+                GenerationJob.state == 'running',
+                GenerationJob.updated_at < now - datetime.timedelta(seconds=STALE_AFTER),
+            ).update({'state': 'failed', 'error': 'worker stopped responding', 'finished_at': now},
+                     synchronize_session=False)
+            session.commit()
+            job = session.query(GenerationJob).filter(GenerationJob.state == 'queued').order_by(GenerationJob.id).first()
+            if job is None:
+                return None
+            # The state guard makes the claim atomic; the running index rejects a second running job
+            claimed = session.query(GenerationJob).filter(
+                GenerationJob.id == job.id, GenerationJob.state == 'queued',
+            ).update({'state': 'running', 'started_at': now, 'updated_at': now}, synchronize_session=False)
+            session.commit()
+            return job.id if claimed else None
+        except IntegrityError:
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def _update(self, job_id, **values):
+        session = self._session()
+        try:
+            session.query(GenerationJob).filter(GenerationJob.id == job_id).update(values, synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _run(self, job_id):
+        session = self._session()
+        job = session.get(GenerationJob, job_id)
+        options = json.loads(job.options)
+        last_write = [0.0]
+
+        def progress(values):
+            # Every phase change is written; search updates at most every PROGRESS_INTERVAL
+            now = time.monotonic()
+            if values['phase'] == 'search' and values['placed'] and now - last_write[0] < PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+            self._update(job_id, progress=json.dumps(values), updated_at=_now())
+
+        # The search may go quiet for longer than STALE_AFTER (e.g. parallel
+        # starts report only when they finish), so beat independently of progress
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(HEARTBEAT_INTERVAL):
+                try:
+                    self._update(job_id, updated_at=_now())
+                except Exception:
+                    logger.exception("Heartbeat of generation job %s failed", job_id)
+
+        beat = threading.Thread(target=heartbeat, name=f'generation-heartbeat-{job_id}', daemon=True)
+        beat.start()
+        try:
+            stats = {}
+            summary = generate_timetable(session, self.days, self.time_slots, stats=stats, progress=progress,
+                                         created_by=job.submitted_by, **options)
+            result = {'entries': len(summary) - stats['unscheduled'], 'unscheduled': stats['unscheduled'],
+                      'elapsed': round(stats['elapsed'], 2), 'score': stats['score'],
+                      'version': stats['version_id'], 'published': options.get('publish', True)}
+            self._update(job_id, state='done', result=json.dumps(result), finished_at=_now(), updated_at=_now())
+        except Exception as exc:
+            session.rollback()
+            self._update(job_id, state='failed', error=str(exc), finished_at=_now(), updated_at=_now())
+        finally:
+            stopped.set()
+            beat.join()
+            session.close()
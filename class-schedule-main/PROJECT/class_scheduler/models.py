@@ -0,0 +1,3 @@
+# ClassCancellation and RoomChange now live in scheduler.py next to the other
+# models, so the tables are created with the rest of the schema
+from .scheduler import ClassCancellation, RoomChange  # noqa: F401
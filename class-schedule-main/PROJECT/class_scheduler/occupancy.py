@@ -0,0 +1,277 @@
+"""
+Bitmask occupancy engine used by the timetable generator.
+
+Every (day, slot) pair of the weekly grid is a *cell*, numbered
+``day_index * len(time_slots) + slot_index``.
+
+- Rooms are tracked per cell as an int bitmask (bit i set = room i is taken).
+- Teachers and classes are tracked as bitmasks over cells (bit c set = busy in cell c).
+- With room capacities, rooms are indexed in ascending capacity order. A class
+  of a given size fits the rooms from bisect(capacities, size) up, so the
+  lowest free bit above that floor is the smallest free room that fits.
+- Teachers with a maximum daily or weekly load keep running counters of their
+  placed lessons per day; a day (or the whole week) that reaches its limit is
+  added to the teacher's blocked cells, so the limits cost no extra scans.
+
+Rooms, teachers and classes are kept in separate tables, so their ids can never
+collide. Finding a free placement is a couple of AND/NOT operations plus a
+lowest-set-bit lookup instead of a scan over days x slots x rooms.
+
+OccupancyCache is the read side used by the lookups in scheduler.py: it keeps
+the occupied rooms and teachers per (database, day, start, end) in memory.
+"""
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+def lowest_bit(mask):
+    """Index of the lowest set bit of ``mask`` (which must be non-zero)."""
+    return (mask & -mask).bit_length() - 1
+
+
+class Occupancy:
+    def __init__(self, days, time_slots, room_ids, capacities=None):
+        """capacities, if given, lists the room capacities in room_ids order, which must be ascending."""
+        self.days = list(days)
+        self.time_slots = list(time_slots)
+        self.room_ids = list(room_ids)
+        self.capacities = list(capacities) if capacities is not None else None
+        self.room_index = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self.n_cells = len(self.days) * len(self.time_slots)
+        self.all_rooms = (1 << len(self.room_ids)) - 1
+        self.all_cells = (1 << self.n_cells) - 1
+        self.rooms = [0] * self.n_cells
+        # Cells where every room is taken; with no rooms at all nothing fits
+        self.full_cells = 0 if self.room_ids else self.all_cells
+        self.teachers = {}  # teacher_id -> bitmask of busy cells
+        self.classes = {}   # class_id -> bitmask of busy cells
+        self.class_floor = {}  # class_id -> index of the smallest room the class fits in
+        self.full_from = {}    # room floor -> bitmask of cells where every room from the floor up is taken
+        n_slots = len(self.time_slots)
+        self.day_masks = [((1 << n_slots) - 1) << (d * n_slots) for d in range(len(self.days))]
+        self.teacher_limits = {}  # teacher_id -> (max per day or None, max per week or None)
+        self.teacher_load = {}    # teacher_id -> lessons per day, for teachers with limits
+        self.teacher_blocked = {}  # teacher_id -> bitmask of cells closed by the limits
+
+    def cell(self, day_index, slot_index):
+        return day_index * len(self.time_slots) + slot_index
+
+    def cell_of(self, day, slot):
+        """Cell for a (day, (start, end)) pair, or None if it is not on the grid."""
+        try:
+            return self.cell(self.days.index(day), self.time_slots.index(tuple(slot)))
+        except ValueError:
+            return None
+
+    def day_slot(self, cell):
+        """Return (day, (start, end)) for a cell."""
+        day_index, slot_index = divmod(cell, len(self.time_slots))
+        return self.days[day_index], self.time_slots[slot_index]
+
+    def set_class_size(self, class_id, size):
+        """Only offer the class rooms with at least ``size`` seats (needs capacities)."""
+        if not size or self.capacities is None:
+            return
+        floor = bisect_left(self.capacities, size)
+        self.class_floor[class_id] = floor
+        if floor and floor not in self.full_from:
+            rooms_above = self.all_rooms >> floor
+            self.full_from[floor] = sum(1 << cell for cell in range(self.n_cells)
+                                        if self.rooms[cell] >> floor == rooms_above)
+
+    def set_teacher_limits(self, teacher_id, daily=None, weekly=None):
+        """Cap the teacher's lessons per day and per week (None = no limit)."""
+        if not daily and not weekly:
+            return
+        self.teacher_limits[teacher_id] = (daily, weekly)
+        busy = self.teachers.get(teacher_id, 0)
+        self.teacher_load[teacher_id] = [(busy & mask).bit_count() for mask in self.day_masks]
+        self._update_blocked(teacher_id)
+
+    def _update_blocked(self, teacher_id):
+        daily, weekly = self.teacher_limits[teacher_id]
+        load = self.teacher_load[teacher_id]
+        if weekly and sum(load) >= weekly:
+            blocked = self.all_cells
+        else:
+            blocked = 0
+            if daily:
+                for mask, count in zip(self.day_masks, load):
+                    if count >= daily:
+                        blocked |= mask
+        self.teacher_blocked[teacher_id] = blocked
+
+    def day_of(self, cell):
+        """Mask of all cells on the same day as ``cell``."""
+        return self.day_masks[cell // len(self.time_slots)]
+
+    def fits(self, room, class_id):
+        return room >= self.class_floor.get(class_id, 0)
+
+    def free_cells(self, teacher_id, class_id):
+        """Bitmask of cells where the teacher and the class are free and a room that fits the class is left."""
+        floor = self.class_floor.get(class_id, 0)
+        full = self.full_from[floor] if floor else self.full_cells
+        busy = self.teachers.get(teacher_id, 0) | self.classes.get(class_id, 0) | full
+        if self.teacher_blocked:
+            busy |= self.teacher_blocked.get(teacher_id, 0)
+        return self.all_cells & ~busy
+
+    def free_rooms(self, cell, class_id=None):
+        """Bitmask of rooms that are still free in ``cell`` (and fit the class, if given)."""
+        free = self.all_rooms & ~self.rooms[cell]
+        if class_id is not None:
+            floor = self.class_floor.get(class_id, 0)
+            free = free >> floor << floor
+        return free
+
+    def free_room(self, cell, class_id=None):
+        """Index of the first free room in ``cell``, or None. With capacities that is the smallest that fits."""
+        free = self.free_rooms(cell, class_id)
+        return lowest_bit(free) if free else None
+
+    def first_fit(self, teacher_id, class_id, avoid=0):
+        """
+        First (cell, room_index) where the lesson fits, in day/slot/room order,
+        or None. Cells in ``avoid`` (e.g. days that already have this course) are
+        only used when nothing else is free.
+        """
+        cells = self.free_cells(teacher_id, class_id)
+        if not cells:
+            return None
+        cell = lowest_bit(cells & ~avoid or cells)
+        return cell, self.free_room(cell, class_id)
+
+    def _update_full(self, cell):
+        bit = 1 << cell
+        for floor in self.full_from:
+            if self.rooms[cell] >> floor == self.all_rooms >> floor:
+                self.full_from[floor] |= bit
+            else:
+                self.full_from[floor] &= ~bit
+
+    def place(self, cell, room, teacher_id, class_id):
+        bit = 1 << cell
+        self.rooms[cell] |= 1 << room
+        if self.rooms[cell] == self.all_rooms:
+            self.full_cells |= bit
+        if self.full_from:
+            self._update_full(cell)
+        self.teachers[teacher_id] = self.teachers.get(teacher_id, 0) | bit
+        self.classes[class_id] = self.classes.get(class_id, 0) | bit
+        if teacher_id in self.teacher_limits:
+            self.teacher_load[teacher_id][cell // len(self.time_slots)] += 1
+            self._update_blocked(teacher_id)
+
+    def release(self, cell, room, teacher_id, class_id):
+        bit = 1 << cell
+        self.rooms[cell] &= ~(1 << room)
+        self.full_cells &= ~bit
+        if self.full_from:
+            self._update_full(cell)
+        self.teachers[teacher_id] = self.teachers.get(teacher_id, 0) & ~bit
+        self.classes[class_id] = self.classes.get(class_id, 0) & ~bit
+        if teacher_id in self.teacher_limits:
+            self.teacher_load[teacher_id][cell // len(self.time_slots)] -= 1
+            self._update_blocked(teacher_id)
+
+    def is_free(self, cell, room, teacher_id, class_id):
+        bit = 1 << cell
+        return (not self.rooms[cell] & (1 << room)
+                and not self.teachers.get(teacher_id, 0) & bit
+                and not self.teacher_blocked.get(teacher_id, 0) & bit
+                and not self.classes.get(class_id, 0) & bit)
+
+    def copy(self):
+        other = Occupancy.__new__(Occupancy)
+        other.__dict__.update(self.__dict__)
+        other.rooms = list(self.rooms)
+        other.teachers = dict(self.teachers)
+        other.classes = dict(self.classes)
+        other.class_floor = dict(self.class_floor)
+        other.full_from = dict(self.full_from)
+        other.teacher_load = {teacher_id: list(load) for teacher_id, load in self.teacher_load.items()}
+        other.teacher_blocked = dict(self.teacher_blocked)
+        return other
+
+
+class OccupancyCache:
+    """
+    Process-wide read-through cache of who is busy in a time slot.
+
+    Keys are ``(db, day, start_time, end_time)`` and values are
+    ``(frozenset of room ids, frozenset of teacher ids)``. Entries are built
+    lazily by the caller's loader, the least recently used ones are evicted
+    beyond ``maxsize``, and the scheduler's write paths invalidate them. A
+    slot's entry covers every booking that overlaps it, so a write invalidates
+    the whole day it touches. Each process has its own cache, so callers also
+    pass a ``stamp`` that every write changes (the scheduler uses the published
+    version and its revision); an entry stored under another stamp is a miss,
+    which makes writes by other processes visible on the next lookup.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped by every invalidate(), so a load that raced with a write is not stored
+        self._generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, loader, stamp=None):
+        """
+        Return {key: (rooms, teachers)} for keys, calling loader(missing_keys)
+        once for the keys that are not cached under stamp. The loader returns a
+        dict with an entry for every key it was given that has any bookings.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for key in keys:
+                cached = self._entries.get(key)
+                if cached is not None and cached[0] == stamp:
+                    self._entries.move_to_end(key)
+                    found[key] = cached[1]
+                    self.hits += 1
+                else:
+                    missing.append(key)
+                    self.misses += 1
+        if missing:
+            loaded = loader(missing)
+            empty = (frozenset(), frozenset())
+            with self._lock:
+                for key in missing:
+                    found[key] = loaded.get(key, empty)
+                    # The loader may have read data that was invalidated since;
+                    # return it to this caller, but do not cache it
+                    if self._generation == generation:
+                        self._entries[key] = (stamp, found[key])
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return found
+
+    def get(self, key, loader, stamp=None):
+        return self.get_many([key], loader, stamp)[key]
+
+    def invalidate(self, db=None, key=None, day=None):
+        """Drop one slot, every slot of one day or of one database, or everything."""
+        with self._lock:
+            self.invalidations += 1
+            self._generation += 1
+            if key is not None:
+                self._entries.pop(key, None)
+            elif db is not None:
+                for cached in [k for k in self._entries if k[0] == db and (day is None or k[1] == day)]:
+                    del self._entries[cached]
+            else:
+                self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
@@ -0,0 +1,1269 @@
+import datetime
+import os
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from itertools import groupby
+import threading
+import time
+import zlib
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, ForeignKey, DateTime, Table, Boolean
+from sqlalchemy.orm import joinedload, relationship, sessionmaker, declarative_base
+from sqlalchemy import Index, UniqueConstraint, and_, exists, func, literal, or_, select
+from sqlalchemy.pool import StaticPool
+from .instrumentation import phase, scoped, current_scope
+from .occupancy import Occupancy, OccupancyCache
+
+Base = declarative_base()
+
+# Password hashing: werkzeug's default method (scrypt) unless a method or, for
+# pbkdf2, an iteration count is configured. pbkdf2 needs less memory per check
+# than scrypt, which matters when many users log in at once. Hashes made with
+# other settings still verify and are upgraded on the next login when the
+# configured setting is at least as strong.
+PASSWORD_METHOD = os.environ.get('SCHEDULER_PASSWORD_METHOD')
+PASSWORD_ITERATIONS = os.environ.get('SCHEDULER_PASSWORD_ITERATIONS')
+_hash_prefixes = {}  # method -> the "method:params" prefix of the hashes it makes
+
+def password_method():
+    """The werkzeug method string for new password hashes, None for werkzeug's default."""
+    method = PASSWORD_METHOD
+    if method is None and PASSWORD_ITERATIONS:
+        method = 'pbkdf2:sha256'
+    if method and method.startswith('pbkdf2') and method.count(':') < 2 and PASSWORD_ITERATIONS:
+        return f"{method}:{int(PASSWORD_ITERATIONS)}"
+    return method
+
+# werkzeug.security is imported on first use: it is slow to import and most
+# scripts never touch a password
+def _hash_password(password, method):
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password, method) if method else generate_password_hash(password)
+
+def _hash_prefix(method):
+    # werkzeug fills in defaults (e.g. scrypt's cost), so ask it once per method
+    if method not in _hash_prefixes:
+        _hash_prefixes[method] = _hash_password('', method).split('$', 1)[0]
+    return _hash_prefixes[method]
+
+def _stronger_or_equal(prefix, stored):
+    """True if hash settings `prefix` are the same method as `stored`, with no lower cost parameter."""
+    new, old = prefix.split(':'), stored.split(':')
+    if len(new) != len(old):
+        return False
+    for a, b in zip(new, old):
+        if a.isdigit() and b.isdigit():
+            if int(a) < int(b):
+                return False
+        elif a != b:
+            return False
+    return True
+
+# User authentication model
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, nullable=False)
+    password_hash = Column(String, nullable=False)
+    is_admin_user = Column(Boolean, default=False)
+
+    def set_password(self, password):
+        self.password_hash = _hash_password(password, password_method())
+
+    def check_password(self, password):
+        from werkzeug.security import check_password_hash
+        return check_password_hash(self.password_hash, password)
+
+    def needs_rehash(self):
+        """
+        True if the configured settings differ from the hash's and are at least
+        as strong: the same method with no lower cost parameter. Hashes made
+        with another method or at a higher cost are kept as they are.
+        """
+        stored = self.password_hash.split('$', 1)[0]
+        prefix = _hash_prefix(password_method())
+        return stored != prefix and _stronger_or_equal(prefix, stored)
+
+    def is_admin(self):
+        return self.is_admin_user
+
+    def __repr__(self):
+        return f"<User(username={self.username}, admin={self.is_admin_user})>"
+
+# Association table for class-course-teacher mapping
+class ClassCourseTeacher(Base):
+    __tablename__ = 'class_course_teacher'
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.id'))
+    course_id = Column(Integer, ForeignKey('courses.id'))
+    teacher_id = Column(Integer, ForeignKey('teachers.id'))
+    periods_per_week = Column(Integer, default=1)  # lessons of the course per week; NULL on old rows means 1
+    __table_args__ = (UniqueConstraint('class_id', 'course_id', name='_class_course_uc'),)
+
+    class_ = relationship('Class', back_populates='course_teachers')
+    course = relationship('Course')
+    teacher = relationship('Teacher')
+
+# Models
+class Classroom(Base):
+    __tablename__ = 'classrooms'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    capacity = Column(Integer)
+    
+    def __repr__(self):
+        return f"<Classroom(name={self.name}, capacity={self.capacity})>"
+
+class Course(Base):
+    __tablename__ = 'courses'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    
+    def __repr__(self):
+        return f"<Course(name={self.name})>"
+
+class Teacher(Base):
+    __tablename__ = 'teachers'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    subject = Column(String)
+    # Load limits enforced by generate_timetable; NULL means no limit
+    max_daily_periods = Column(Integer)
+    max_weekly_periods = Column(Integer)
+    
+    def __repr__(self):
+        return f"<Teacher(name={self.name}, subject={self.subject})>"
+
+class Class(Base):
+    __tablename__ = 'classes'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    size = Column(Integer)  # head count; rooms with a smaller capacity are not used for the class
+    course_teachers = relationship('ClassCourseTeacher', back_populates='class_')
+
+    def __repr__(self):
+        return f"<Class(name={self.name})>"
+
+# Every generation writes a new timetable version; the single pointer row says
+# which version is live, so publishing or rolling back is a one-row update
+class TimetableVersion(Base):
+    __tablename__ = 'timetable_versions'
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False, default='generate')  # generate, incremental or migrated
+    strategy = Column(String)
+    entries = Column(Integer, default=0)
+    unscheduled = Column(Integer, default=0)
+    score = Column(Integer)
+    created_by = Column(Integer, ForeignKey('users.id'))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    published_at = Column(DateTime)  # last time this version was made live
+
+    user = relationship('User')
+
+class TimetablePointer(Base):
+    __tablename__ = 'timetable_pointer'
+    id = Column(Integer, primary_key=True)  # always 1
+    version_id = Column(Integer, ForeignKey('timetable_versions.id'), nullable=False)
+    # Bumped by every write to the published timetable; with version_id it is
+    # the stamp of occupancy_cache entries, so other processes see the write
+    revision = Column(Integer, default=0)
+
+class Timetable(Base):
+    __tablename__ = 'timetables'
+    id = Column(Integer, primary_key=True)
+    version_id = Column(Integer, ForeignKey('timetable_versions.id'))
+    class_id = Column(Integer, ForeignKey('classes.id'))
+    classroom_id = Column(Integer, ForeignKey('classrooms.id'))
+    course_id = Column(Integer, ForeignKey('courses.id'))
+    teacher_id = Column(Integer, ForeignKey('teachers.id'))
+    day = Column(String)
+    start_time = Column(String)
+    end_time = Column(String)
+    # The same slot as minutes from Monday 00:00, kept in sync with the strings
+    # above; conflict checks compare these (see week_interval)
+    week_start = Column(Integer)
+    week_end = Column(Integer)
+    # Reads are of one version (see live()), so every index leads with it
+    __table_args__ = (
+        Index('ix_timetables_version_week_classroom', 'version_id', 'week_start', 'classroom_id'),
+        Index('ix_timetables_version_classroom_week', 'version_id', 'classroom_id', 'week_start'),
+        Index('ix_timetables_version_teacher_week', 'version_id', 'teacher_id', 'week_start'),
+        Index('ix_timetables_version_class_week', 'version_id', 'class_id', 'week_start'),
+    )
+    
+    class_ = relationship('Class')
+    classroom = relationship('Classroom')
+    course = relationship('Course')
+    teacher = relationship('Teacher')
+
+    def __repr__(self):
+        return f"<Timetable(class={self.class_.name}, classroom={self.classroom.name}, course={self.course.name}, teacher={self.teacher.name}, day={self.day}, {self.start_time}-{self.end_time})>"
+
+# Compact slot encoding: a booking is the half-open interval
+# [week_start, week_end) in minutes from Monday 00:00, so two bookings clash
+# exactly when their intervals overlap, whatever their start and end strings
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MINUTES_PER_DAY = 24 * 60
+
+def to_minutes(time_text):
+    """'09:30' -> 570"""
+    hours, minutes = time_text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def week_interval(day, start_time, end_time):
+    """(week_start, week_end) of a slot, or (None, None) if the day or a time cannot be parsed."""
+    try:
+        offset = DAY_NAMES.index(day) * MINUTES_PER_DAY
+        return offset + to_minutes(start_time), offset + to_minutes(end_time)
+    except (ValueError, AttributeError):
+        return None, None
+
+def slot_columns(day, start_time, end_time):
+    """Timetable column values for a slot, for bulk inserts and updates that bypass the ORM."""
+    week_start, week_end = week_interval(day, start_time, end_time)
+    return dict(day=day, start_time=start_time, end_time=end_time, week_start=week_start, week_end=week_end)
+
+def overlapping(week_start, week_end):
+    """Filter for the timetable rows whose interval overlaps [week_start, week_end)."""
+    # Lessons never cross midnight, which bounds the index range scan to one day
+    day_start = week_start - week_start % MINUTES_PER_DAY
+    return (Timetable.week_start >= day_start) & (Timetable.week_start < week_end) & (Timetable.week_end > week_start)
+
+def published_version():
+    """Scalar subquery of the live version id."""
+    return select(TimetablePointer.version_id).where(TimetablePointer.id == 1).scalar_subquery()
+
+def live():
+    """Filter for the rows of the published timetable version."""
+    return Timetable.version_id == published_version()
+
+@event.listens_for(Timetable, 'before_insert')
+@event.listens_for(Timetable, 'before_update')
+def _sync_week_interval(mapper, connection, target):
+    target.week_start, target.week_end = week_interval(target.day, target.start_time, target.end_time)
+
+# One-off changes to the weekly timetable on a specific date
+class ClassCancellation(Base):
+    __tablename__ = 'class_cancellations'
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.id'))
+    course_id = Column(Integer, ForeignKey('courses.id'))
+    date = Column(DateTime, nullable=False)
+    reason = Column(String)
+    cancelled_by = Column(Integer, ForeignKey('users.id'))
+    cancelled_at = Column(DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (Index('ix_class_cancellations_date_class', 'date', 'class_id'),)
+
+    class_ = relationship('Class')
+    course = relationship('Course')
+    user = relationship('User')
+
+class RoomChange(Base):
+    __tablename__ = 'room_changes'
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.id'))
+    course_id = Column(Integer, ForeignKey('courses.id'))
+    old_room_id = Column(Integer, ForeignKey('classrooms.id'))
+    new_room_id = Column(Integer, ForeignKey('classrooms.id'))
+    date = Column(DateTime, nullable=False)
+    reason = Column(String)
+    changed_by = Column(Integer, ForeignKey('users.id'))
+    changed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (
+        Index('ix_room_changes_date_class', 'date', 'class_id'),
+        Index('ix_room_changes_date_old_room', 'date', 'old_room_id'),
+    )
+
+    class_ = relationship('Class')
+    course = relationship('Course')
+    old_room = relationship('Classroom', foreign_keys=[old_room_id])
+    new_room = relationship('Classroom', foreign_keys=[new_room_id])
+    user = relationship('User')
+
+# Queue of timetable generations, run one at a time by jobs.JobQueue
+class GenerationJob(Base):
+    __tablename__ = 'generation_jobs'
+    id = Column(Integer, primary_key=True)
+    options = Column(String, nullable=False)      # JSON keyword arguments for generate_timetable
+    options_key = Column(String, nullable=False)  # canonical form of options, for de-duplication
+    state = Column(String, nullable=False, default='queued')  # queued, running, done or failed
+    progress = Column(String)  # JSON, see generate_timetable(progress=...)
+    result = Column(String)    # JSON statistics of a finished run
+    error = Column(String)
+    submitted_by = Column(Integer, ForeignKey('users.id'))
+    submitted_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime)  # heartbeat of the running job
+    finished_at = Column(DateTime)
+    __table_args__ = (
+        # At most one pending job per set of options, and one running job overall
+        Index('ux_generation_jobs_pending', 'options_key', unique=True,
+              sqlite_where=text("state IN ('queued', 'running')"),
+              postgresql_where=text("state IN ('queued', 'running')")),
+        Index('ux_generation_jobs_running', 'state', unique=True,
+              sqlite_where=text("state = 'running'"), postgresql_where=text("state = 'running'")),
+    )
+
+# Process-wide cache of occupied rooms/teachers per time slot (see occupancy.py)
+occupancy_cache = OccupancyCache()
+
+def _db_key(session):
+    return str(session.get_bind().url)
+
+def _load_slot_occupancy(session, db, keys):
+    """
+    occupancy_cache loader: rooms and teachers booked in any slot that overlaps
+    one of the given slots, in one range query.
+    """
+    intervals = {}  # day index -> [(key, week_start, week_end)]
+    for key in keys:
+        week_start, week_end = week_interval(*key[1:])
+        if week_start is not None:
+            intervals.setdefault(week_start // MINUTES_PER_DAY, []).append((key, week_start, week_end))
+    rooms, teachers = {}, {}
+    if intervals:
+        low = min(start for day in intervals.values() for _, start, _ in day)
+        high = max(end for day in intervals.values() for _, _, end in day)
+        rows = session.query(
+            Timetable.week_start, Timetable.week_end, Timetable.classroom_id, Timetable.teacher_id
+        ).filter(live(), Timetable.week_start >= low - low % MINUTES_PER_DAY, Timetable.week_start < high,
+                 Timetable.week_end > low)
+        for row in rows:
+            for key, week_start, week_end in intervals.get(row.week_start // MINUTES_PER_DAY, ()):
+                if row.week_start < week_end and row.week_end > week_start:
+                    if row.classroom_id is not None:
+                        rooms.setdefault(key, set()).add(row.classroom_id)
+                    teachers.setdefault(key, set()).add(row.teacher_id)
+    return {key: (frozenset(rooms.get(key, ())), frozenset(teachers.get(key, ()))) for key in keys}
+
+# Database setup
+# Connection pool and SQLite lock-wait settings, overridable from the environment
+POOL_SIZE = int(os.environ.get('SCHEDULER_DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.environ.get('SCHEDULER_DB_MAX_OVERFLOW', 10))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SCHEDULER_SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+_engines = {}
+_sessionmakers = {}
+_engines_lock = threading.Lock()
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers keep going while a writer commits; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def _create_engine(db_url):
+    if not db_url.startswith('sqlite'):
+        return create_engine(db_url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+    if db_url in ('sqlite://', 'sqlite:///:memory:'):
+        # An in-memory database lives in one connection; share it between threads
+        engine = create_engine(db_url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    else:
+        engine = create_engine(db_url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                               connect_args={'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000})
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
+
+def _add_missing_columns(engine):
+    """ALTER TABLE ... ADD COLUMN for model columns missing from tables created by an older version."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    kind = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {kind}"))
+
+def _migrate_slot_columns(engine):
+    """Backfill week_start/week_end on timetable rows written before they existed."""
+    table = Timetable.__table__
+    with engine.begin() as connection:
+        # One UPDATE per distinct slot string, not per row
+        slots = connection.execute(
+            text("SELECT DISTINCT day, start_time, end_time FROM timetables WHERE week_start IS NULL")).all()
+        for day, start_time, end_time in slots:
+            week_start, week_end = week_interval(day, start_time, end_time)
+            if week_start is None:
+                continue
+            connection.execute(table.update().where(
+                table.c.day == day, table.c.start_time == start_time, table.c.end_time == end_time,
+                table.c.week_start.is_(None),
+            ).values(week_start=week_start, week_end=week_end))
+
+# Timetable indexes that were replaced by the version-leading ones
+_OLD_TIMETABLE_INDEXES = ('ix_timetables_week_classroom', 'ix_timetables_classroom_week',
+                          'ix_timetables_teacher_week', 'ix_timetables_class_week')
+
+def _migrate_timetable_versions(engine):
+    """Put timetable rows written before versions existed into one version, published if none is."""
+    with engine.begin() as connection:
+        for name in _OLD_TIMETABLE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        entries = connection.execute(text("SELECT COUNT(*) FROM timetables WHERE version_id IS NULL")).scalar()
+        if not entries:
+            return
+        now = datetime.datetime.utcnow()
+        version_id = connection.execute(TimetableVersion.__table__.insert().values(
+            source='migrated', entries=entries, unscheduled=0, created_at=now,
+        )).inserted_primary_key[0]
+        connection.execute(text("UPDATE timetables SET version_id = :version WHERE version_id IS NULL"),
+                           {'version': version_id})
+        if connection.execute(text("SELECT COUNT(*) FROM timetable_pointer")).scalar() == 0:
+            connection.execute(TimetablePointer.__table__.insert().values(id=1, version_id=version_id))
+            connection.execute(TimetableVersion.__table__.update().where(
+                TimetableVersion.__table__.c.id == version_id).values(published_at=now))
+
+def schema_fingerprint():
+    """Checksum of the tables, columns and indexes of the models, as a positive 31-bit integer."""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return zlib.crc32('\n'.join(parts).encode()) & 0x7fffffff
+
+def _schema_current(engine):
+    # SQLite keeps the fingerprint of the last checked schema in user_version,
+    # so a process opening an up-to-date file skips the checks below
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("PRAGMA user_version").scalar() == schema_fingerprint()
+
+def init_db(engine):
+    Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    _migrate_slot_columns(engine)
+    _migrate_timetable_versions(engine)
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {schema_fingerprint()}")
+
+def get_engine(db_url='sqlite:///scheduler.db'):
+    """
+    Return the process-wide pooled engine for db_url, creating it (and checking
+    the schema, unless an SQLite file says it is current) only the first time a
+    URL is used.
+    """
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = _create_engine(db_url)
+            if not _schema_current(engine):
+                init_db(engine)
+            _engines[db_url] = engine
+            _sessionmakers[db_url] = sessionmaker(bind=engine)
+        return engine
+
+def get_sessionmaker(db_url='sqlite:///scheduler.db'):
+    get_engine(db_url)
+    return _sessionmakers[db_url]
+
+def get_session(db_url='sqlite:///scheduler.db'):
+    return get_sessionmaker(db_url)()
+
+# Versioned cache of the small reference tables used to fill dropdowns.
+# Writes through the add_* functions and importer.py bump the version; the TTL
+# bounds how stale another process's writes can look.
+REFERENCE_TTL = 60  # seconds
+REFERENCE_COLUMNS = {
+    'classrooms': ('id', 'name', 'capacity'),
+    'courses': ('id', 'name'),
+    'teachers': ('id', 'name', 'subject'),
+    'classes': ('id', 'name'),
+}
+_reference_version = 0
+_reference_cache = {}  # (db, table name) -> (version, loaded at, rows)
+
+def invalidate_reference_data():
+    global _reference_version
+    _reference_version += 1
+
+def reference_data(session, model):
+    """Lightweight (id, name, ...) rows of a reference table, cached between writes."""
+    table = model.__tablename__
+    key = (_db_key(session), table)
+    now = time.monotonic()
+    cached = _reference_cache.get(key)
+    if cached and cached[0] == _reference_version and now - cached[1] < REFERENCE_TTL:
+        return cached[2]
+    version = _reference_version
+    columns = [getattr(model, name) for name in REFERENCE_COLUMNS[table]]
+    rows = session.query(*columns).order_by(model.id).all()
+    _reference_cache[key] = (version, now, rows)
+    return rows
+
+# Session users, cached like the reference data: most requests only need the
+# id, name and admin flag of the logged-in user
+USER_TTL = 60  # seconds
+_user_version = 0
+_user_cache = {}  # (db, user id) -> (version, loaded at, UserSummary)
+
+class UserSummary(namedtuple('UserSummary', 'id username is_admin_user')):
+    """Read-only copy of a User that can be shared between requests."""
+
+    def is_admin(self):
+        return bool(self.is_admin_user)
+
+def invalidate_users():
+    global _user_version
+    _user_version += 1
+
+def cached_user(session, user_id):
+    """UserSummary of a user by primary key, or None; cached between user writes."""
+    key = (_db_key(session), user_id)
+    now = time.monotonic()
+    cached = _user_cache.get(key)
+    if cached and cached[0] == _user_version and now - cached[1] < USER_TTL:
+        return cached[2]
+    version = _user_version
+    row = session.query(User.id, User.username, User.is_admin_user).filter(User.id == user_id).first()
+    if row is None:
+        _user_cache.pop(key, None)
+        return None
+    user = UserSummary(*row)
+    _user_cache[key] = (version, now, user)
+    return user
+
+def _capacity_key(room):
+    return (room.capacity or 0, room.id)
+
+_capacity_index = {}  # db -> (reference rows it was built from, capacities, rooms)
+
+def classrooms_by_capacity(session):
+    """
+    (capacities, rooms): the classroom reference rows sorted by capacity then
+    id, and their capacities as a parallel list to bisect. Rebuilt only when
+    reference_data reloads the classrooms.
+    """
+    rooms = reference_data(session, Classroom)
+    db = _db_key(session)
+    cached = _capacity_index.get(db)
+    if cached is None or cached[0] is not rooms:
+        ordered = sorted(rooms, key=_capacity_key)
+        cached = _capacity_index[db] = (rooms, [room.capacity or 0 for room in ordered], ordered)
+    return cached[1], cached[2]
+
+def rooms_with_capacity(session, min_capacity=None):
+    """Classroom reference rows with at least min_capacity seats, smallest first."""
+    capacities, rooms = classrooms_by_capacity(session)
+    return rooms[bisect_left(capacities, min_capacity):] if min_capacity else rooms
+
+# Add functions
+def add_classroom(session, name, capacity):
+    classroom = Classroom(name=name, capacity=capacity)
+    session.add(classroom)
+    session.commit()
+    invalidate_reference_data()
+    return classroom
+
+def add_course(session, name):
+    course = Course(name=name)
+    session.add(course)
+    session.commit()
+    invalidate_reference_data()
+    return course
+
+def add_teacher(session, name, subject, max_daily_periods=None, max_weekly_periods=None):
+    """The period limits are optional; a limit below 1 raises ValueError (use None for no limit)."""
+    for label, limit in (('max daily periods', max_daily_periods), ('max weekly periods', max_weekly_periods)):
+        if limit is not None and limit < 1:
+            raise ValueError(f"invalid {label} {limit!r}")
+    teacher = Teacher(name=name, subject=subject, max_daily_periods=max_daily_periods,
+                      max_weekly_periods=max_weekly_periods)
+    session.add(teacher)
+    session.commit()
+    invalidate_reference_data()
+    return teacher
+
+# Add a class and assign one teacher per course
+def add_class(session, name, course_teacher_map, size=None, periods_per_week=None):
+    """
+    course_teacher_map: dict of {course_id: teacher_id}
+    size: optional head count, used to pick rooms that are large enough
+    periods_per_week: optional dict of {course_id: lessons per week} (default 1)
+    """
+    class_ = Class(name=name, size=size)
+    session.add(class_)
+    session.commit()
+    for course_id, teacher_id in course_teacher_map.items():
+        cct = ClassCourseTeacher(class_id=class_.id, course_id=course_id, teacher_id=teacher_id,
+                                 periods_per_week=(periods_per_week or {}).get(course_id, 1))
+        session.add(cct)
+    session.commit()
+    invalidate_reference_data()
+    return class_
+
+
+def _pin_existing_rows(session, assignments, days, time_slots, room_ids, capacities=None, class_sizes=None,
+                       teacher_limits=None):
+    """
+    Split the published timetable for an incremental run.
+    A row stays pinned when its (class, course) is still assigned to the same
+    teacher for at least that many periods a week, its slot and room are still
+    on the grid, the room still fits the class, the teacher's load limits allow
+    it and it does not clash with another pinned row. Returns (pinned
+    placements for the solver, Counter of pinned rows per (class_id,
+    course_id), stale rows keyed by (class_id, course_id)).
+    """
+    grid = Occupancy(days, time_slots, room_ids, capacities)
+    for class_id, size in (class_sizes or {}).items():
+        grid.set_class_size(class_id, size)
+    for teacher_id, (daily, weekly) in (teacher_limits or {}).items():
+        grid.set_teacher_limits(teacher_id, daily, weekly)
+    teacher_of = {(a.class_id, a.course_id): a.teacher_id for a in assignments}
+    periods_of = {(a.class_id, a.course_id): a.periods_per_week or 1 for a in assignments}
+    existing = session.query(
+        Timetable.id, Timetable.class_id, Timetable.course_id, Timetable.teacher_id,
+        Timetable.classroom_id, Timetable.day, Timetable.start_time, Timetable.end_time,
+    ).filter(live()).order_by(Timetable.id).all()
+    pinned, pinned_count, stale = [], Counter(), {}
+    for row in existing:
+        key = (row.class_id, row.course_id)
+        cell = grid.cell_of(row.day, (row.start_time, row.end_time))
+        room = grid.room_index.get(row.classroom_id)
+        if (pinned_count[key] < periods_of.get(key, 0) and teacher_of.get(key) == row.teacher_id
+                and cell is not None and room is not None and grid.fits(room, row.class_id)
+                and grid.is_free(cell, room, row.teacher_id, row.class_id)):
+            grid.place(cell, room, row.teacher_id, row.class_id)
+            pinned.append((cell, room, row.teacher_id, row.class_id, row.course_id))
+            pinned_count[key] += 1
+        else:
+            stale.setdefault(key, []).append(row.id)
+    return pinned, pinned_count, stale
+
+
+# Improved timetable generation function
+@scoped('generate_timetable')
+def generate_timetable(session, days, time_slots, strategy='greedy', time_budget=None, seed=None, stats=None,
+                       starts=1, workers=None, incremental=False, progress=None, publish=True, created_by=None):
+    """
+    Automatically generate a timetable for all classes, courses, and teachers.
+    Each class has only one teacher per course (enforced by ClassCourseTeacher),
+    who teaches it periods_per_week times a week, on different days where
+    possible and within the teacher's daily and weekly limits.
+    Avoids room, teacher and class conflicts; see solver.py for the available
+    strategies ('greedy' first fit, or 'solver' backtracking + annealing within
+    time_budget seconds). A class with a size only gets rooms with at least that
+    capacity, and each lesson takes the smallest free room that fits.
+    Pass a dict as stats to receive the search statistics.
+    With starts > 1, that many shuffled orderings are searched in parallel on
+    `workers` processes and the best-scoring one is kept.
+    The result is written as a new timetable version (see TimetableVersion)
+    with a single bulk insert and, unless publish=False, made live by flipping
+    the version pointer; earlier versions stay available for diff_versions and
+    rollback_timetable. With incremental=True the published entries stay where
+    they are: they are copied into the new version in one INSERT ... SELECT
+    and only new or changed course assignments (or extra periods) are placed.
+    With instrumentation enabled, stats also gets the SQL statement count and
+    the time spent in the load, search and persist phases.
+    progress, if given, is called with a dict {'phase', 'lessons', 'placed',
+    'conflicts'} as the run moves through those phases and the search advances.
+    The new version is written and published in one transaction, so readers
+    keep seeing the previous one until it commits, and a failed run leaves the
+    published timetable untouched. created_by is recorded on the version.
+    Returns a summary of the generated timetable.
+    """
+    def report(phase_name, placed=0, conflicts=0):
+        if progress:
+            progress({'phase': phase_name, 'lessons': len(lessons), 'placed': placed, 'conflicts': conflicts})
+
+    lessons = []
+    report('load')
+    with phase('load'):
+        # Room indexes run in ascending capacity, so the lowest free one that fits is the best fit
+        classrooms = sorted(session.query(Classroom.id, Classroom.name, Classroom.capacity), key=_capacity_key)
+        assignments = (
+            session.query(
+                ClassCourseTeacher.class_id, ClassCourseTeacher.course_id, ClassCourseTeacher.teacher_id,
+                ClassCourseTeacher.periods_per_week, Class.size.label('class_size'), Class.name.label('class_name'),
+                Course.name.label('course_name'), Teacher.name.label('teacher_name'),
+            )
+            .join(Class, ClassCourseTeacher.class_id == Class.id)
+            .join(Course, ClassCourseTeacher.course_id == Course.id)
+            .join(Teacher, ClassCourseTeacher.teacher_id == Teacher.id)
+            .order_by(Class.id, ClassCourseTeacher.id)
+            .all()
+        )
+        room_ids = [room.id for room in classrooms]
+        capacities = [room.capacity or 0 for room in classrooms]
+        class_sizes = {a.class_id: a.class_size for a in assignments if a.class_size}
+        teacher_limits = {row.id: (row.max_daily_periods, row.max_weekly_periods) for row in session.query(
+            Teacher.id, Teacher.max_daily_periods, Teacher.max_weekly_periods,
+        ).filter(or_(Teacher.max_daily_periods.isnot(None), Teacher.max_weekly_periods.isnot(None)))}
+        pinned, pinned_count, stale = [], Counter(), {}
+        if incremental:
+            pinned, pinned_count, stale = _pin_existing_rows(session, assignments, days, time_slots, room_ids,
+                                                             capacities, class_sizes, teacher_limits)
+
+    # One lesson per weekly period that is not pinned already
+    periods = [a for a in assignments
+               for _ in range((a.periods_per_week or 1) - pinned_count[(a.class_id, a.course_id)])]
+    lessons = [(a.class_id, a.course_id, a.teacher_id) for a in periods]
+    report('search')
+    search_progress = (lambda placed, conflicts: report('search', placed, conflicts)) if progress else None
+    # Imported here: the solver pulls in concurrent.futures and multiprocessing,
+    # which only generation needs
+    from .solver import solve, solve_multistart
+    with phase('search'):
+        if starts > 1:
+            occupancy, placements, search_stats = solve_multistart(
+                lessons, days, time_slots, room_ids,
+                strategy=strategy, time_budget=time_budget, seed=seed, starts=starts, workers=workers, pinned=pinned,
+                capacities=capacities, class_sizes=class_sizes, teacher_limits=teacher_limits, progress=search_progress,
+            )
+        else:
+            occupancy, placements, search_stats = solve(
+                lessons, days, time_slots, room_ids,
+                strategy=strategy, time_budget=time_budget, seed=seed, pinned=pinned,
+                capacities=capacities, class_sizes=class_sizes, teacher_limits=teacher_limits, progress=search_progress,
+            )
+
+    report('persist', len(lessons) - search_stats['unscheduled'], search_stats['conflicts'])
+    with phase('persist'):
+        version = TimetableVersion(source='incremental' if incremental else 'generate', strategy=strategy,
+                                   unscheduled=search_stats['unscheduled'], score=search_stats['score'],
+                                   created_by=created_by)
+        session.add(version)
+        session.flush()
+        rows = []
+        summary = []
+        for a, placed in zip(periods, placements):
+            if placed is None:
+                summary.append(f"Could not schedule {a.class_name} - {a.course_name}")
+                continue
+            cell, room = placed
+            day, slot = occupancy.day_slot(cell)
+            classroom = classrooms[room]
+            rows.append(dict(
+                version_id=version.id,
+                class_id=a.class_id,
+                classroom_id=classroom.id,
+                course_id=a.course_id,
+                teacher_id=a.teacher_id,
+                **slot_columns(day, slot[0], slot[1])
+            ))
+            summary.append(f"{a.class_name} - {a.course_name} in {classroom.name} by {a.teacher_name} on {day} {slot[0]}-{slot[1]}")
+
+        if incremental:
+            # Copy the pinned rows of the live version without a round trip through Python
+            dropped = [row_id for ids in stale.values() for row_id in ids]
+            columns = [column for column in Timetable.__table__.columns if column.name not in ('id', 'version_id')]
+            session.execute(Timetable.__table__.insert().from_select(
+                ['version_id'] + [column.name for column in columns],
+                select(literal(version.id), *columns).where(live(), Timetable.id.notin_(dropped)),
+            ))
+            search_stats.update(pinned=len(pinned), inserted=len(rows), dropped=len(dropped))
+        session.bulk_insert_mappings(Timetable, rows)
+        version.entries = len(pinned) + len(rows)
+        search_stats['version_id'] = version.id
+        if publish:
+            publish_version(session, version.id, commit=False)
+        session.commit()
+        prune_versions(session)
+    if publish:
+        occupancy_cache.invalidate(db=_db_key(session))
+    if stats is not None:
+        stats.update(search_stats)
+        measured = current_scope()
+        if measured is not None:
+            stats.update(measured.as_dict())
+    print("Timetable generation complete.")
+    return summary
+
+# Timetable versions kept by prune_versions, besides the published one
+KEEP_VERSIONS = int(os.environ.get('SCHEDULER_TIMETABLE_VERSIONS', 10))
+
+def published_version_id(session):
+    return session.query(TimetablePointer.version_id).filter(TimetablePointer.id == 1).scalar()
+
+def _occupancy_stamp(session):
+    """(published version, revision): occupancy_cache entries stored under another stamp are stale."""
+    row = session.query(TimetablePointer.version_id, TimetablePointer.revision).filter(
+        TimetablePointer.id == 1).first()
+    return tuple(row) if row else None
+
+def _bump_revision(session):
+    session.query(TimetablePointer).filter(TimetablePointer.id == 1).update(
+        {'revision': func.coalesce(TimetablePointer.revision, 0) + 1}, synchronize_session=False)
+
+def publish_version(session, version_id, commit=True):
+    """
+    Make a timetable version live by pointing the version pointer at it. Only
+    the pointer row changes, so readers switch between two complete timetables.
+    Raises ValueError if there is no such version.
+    """
+    version = session.get(TimetableVersion, version_id)
+    if version is None:
+        raise ValueError(f"Timetable version {version_id} not found.")
+    version.published_at = datetime.datetime.utcnow()
+    if not session.query(TimetablePointer).filter(TimetablePointer.id == 1).update(
+            {'version_id': version_id, 'revision': func.coalesce(TimetablePointer.revision, 0) + 1},
+            synchronize_session=False):
+        session.add(TimetablePointer(id=1, version_id=version_id, revision=1))
+    if commit:
+        session.commit()
+        occupancy_cache.invalidate(db=_db_key(session))
+    return version
+
+def rollback_timetable(session, version_id=None):
+    """
+    Publish version_id again, by default the version that was published before
+    the current one. Nothing is regenerated. Raises ValueError if there is no
+    version to go back to.
+    """
+    if version_id is None:
+        current = published_version_id(session)
+        previous = session.query(TimetableVersion.id).filter(
+            TimetableVersion.id != current, TimetableVersion.published_at.isnot(None),
+        ).order_by(TimetableVersion.published_at.desc()).first()
+        if previous is None:
+            raise ValueError("No earlier published timetable version.")
+        version_id = previous.id
+    return publish_version(session, version_id)
+
+def prune_versions(session, keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions and their rows; the published version is always kept."""
+    newest = [row.id for row in session.query(TimetableVersion.id).order_by(TimetableVersion.id.desc()).limit(keep)]
+    kept = set(newest) | {published_version_id(session)} - {None}
+    old = [row.id for row in session.query(TimetableVersion.id).filter(TimetableVersion.id.notin_(kept))]
+    if old:
+        session.query(Timetable).filter(Timetable.version_id.in_(old)).delete(synchronize_session=False)
+        session.query(TimetableVersion).filter(TimetableVersion.id.in_(old)).delete(synchronize_session=False)
+        session.commit()
+    return len(old)
+
+def diff_versions(session, old_id, new_id):
+    """
+    Compare two timetable versions by (class, course), reading both in one
+    query ordered by that key. Returns a list of {'class_id', 'class',
+    'course_id', 'course', 'change', 'before', 'after'} dicts, one per
+    (class, course) whose lessons differ; change is 'added', 'removed' or
+    'changed' and before/after are the lessons in each version, as dicts of
+    day, start_time, end_time, classroom and teacher.
+    """
+    rows = (
+        session.query(
+            Timetable.version_id, Timetable.class_id, Class.name.label('class_name'), Timetable.course_id,
+            Course.name.label('course_name'), Timetable.day, Timetable.start_time, Timetable.end_time,
+            Timetable.classroom_id, Classroom.name.label('classroom'), Timetable.teacher_id,
+            Teacher.name.label('teacher'),
+        )
+        .outerjoin(Class, Timetable.class_id == Class.id)
+        .outerjoin(Course, Timetable.course_id == Course.id)
+        .outerjoin(Classroom, Timetable.classroom_id == Classroom.id)
+        .outerjoin(Teacher, Timetable.teacher_id == Teacher.id)
+        .filter(Timetable.version_id.in_((old_id, new_id)))
+        .order_by(Timetable.class_id, Timetable.course_id, Timetable.week_start, Timetable.classroom_id)
+    )
+    changes = []
+    for (class_id, course_id), group in groupby(rows, key=lambda row: (row.class_id, row.course_id)):
+        lessons = {old_id: [], new_id: []}
+        names = None
+        for row in group:
+            names = (row.class_name, row.course_name)
+            lessons[row.version_id].append(dict(
+                day=row.day, start_time=row.start_time, end_time=row.end_time, classroom_id=row.classroom_id,
+                classroom=row.classroom, teacher_id=row.teacher_id, teacher=row.teacher,
+            ))
+        before, after = lessons[old_id], lessons[new_id]
+        if before == after:
+            continue
+        change = 'added' if not before else 'removed' if not after else 'changed'
+        changes.append({'class_id': class_id, 'class': names[0], 'course_id': course_id, 'course': names[1],
+                        'change': change, 'before': before, 'after': after})
+    return changes
+
+def reschedule_classes(session, moves):
+    """
+    Move many timetable entries at once. moves is a list of
+    (timetable_id, new_day, new_start, new_end[, new_classroom_id]) tuples.
+    Every move is checked against room, teacher and class bookings with one
+    query for the other entries plus in-memory checks between the moves, so
+    entries may swap slots or rooms within a batch. Either all moves are
+    applied in one transaction or none is. Entries of the published version are
+    edited in place. Returns the list of problems found (empty on success).
+    """
+    if not moves:
+        return []
+    moves = [tuple(move) + (None,) * (5 - len(move)) for move in moves]
+    ids = [move[0] for move in moves]
+    rows = {row.id: row for row in session.query(
+        Timetable.id, Timetable.class_id, Timetable.teacher_id, Timetable.classroom_id, Timetable.day,
+    ).filter(live(), Timetable.id.in_(ids))}
+    room_ids = {move[4] for move in moves if move[4]}
+    known_rooms = set()
+    if room_ids:
+        known_rooms = {room_id for (room_id,) in session.query(Classroom.id).filter(Classroom.id.in_(room_ids))}
+
+    errors = []
+    targets = []  # (timetable_id, week_start, week_end, classroom_id, teacher_id, class_id)
+    for timetable_id, new_day, new_start, new_end, new_classroom_id in moves:
+        row = rows.get(timetable_id)
+        week_start, week_end = week_interval(new_day, new_start, new_end)
+        if row is None:
+            errors.append(f"Timetable entry {timetable_id} not found.")
+        elif ids.count(timetable_id) > 1:
+            errors.append(f"Timetable entry {timetable_id} is moved more than once.")
+        elif week_start is None or week_start >= week_end:
+            errors.append(f"Entry {timetable_id}: invalid time slot {new_day} {new_start}-{new_end}.")
+        elif new_classroom_id and new_classroom_id not in known_rooms:
+            errors.append(f"Entry {timetable_id}: classroom {new_classroom_id} not found.")
+        else:
+            targets.append((timetable_id, week_start, week_end, new_classroom_id or row.classroom_id,
+                            row.teacher_id, row.class_id))
+    if errors:
+        return sorted(set(errors))
+
+    # Entries that stay put and share a room, teacher or class with a target in
+    # the batch's time range. Moved entries are left out: their old slots are
+    # vacated, which is what lets two entries swap.
+    low = min(target[1] for target in targets)
+    high = max(target[2] for target in targets)
+    others = session.query(
+        Timetable.id, Timetable.week_start, Timetable.week_end,
+        Timetable.classroom_id, Timetable.teacher_id, Timetable.class_id,
+    ).filter(
+        live(), Timetable.id.notin_(ids),
+        Timetable.week_start >= low - low % MINUTES_PER_DAY, Timetable.week_start < high, Timetable.week_end > low,
+        or_(Timetable.classroom_id.in_({target[3] for target in targets}),
+            Timetable.teacher_id.in_({target[4] for target in targets}),
+            Timetable.class_id.in_({target[5] for target in targets})),
+    ).all()
+
+    by_day = {}
+    for booking in others:
+        by_day.setdefault(booking.week_start // MINUTES_PER_DAY, []).append(tuple(booking))
+    for target in targets:
+        day_bookings = by_day.setdefault(target[1] // MINUTES_PER_DAY, [])
+        for booking in day_bookings:
+            if booking[1] < target[2] and booking[2] > target[1]:
+                clash = [name for name, i in (('room', 3), ('teacher', 4), ('class', 5)) if booking[i] == target[i]]
+                if clash:
+                    errors.append(f"Entry {target[0]}: {', '.join(clash)} already booked by entry {booking[0]}.")
+        # Later targets are checked against this one as well
+        day_bookings.append(target)
+    if errors:
+        return errors
+
+    session.bulk_update_mappings(Timetable, [
+        dict(id=timetable_id, classroom_id=new_classroom_id or rows[timetable_id].classroom_id,
+             **slot_columns(new_day, new_start, new_end))
+        for timetable_id, new_day, new_start, new_end, new_classroom_id in moves
+    ])
+    _bump_revision(session)
+    session.commit()
+    # Cached slots that overlap an old or a new time are stale
+    db = _db_key(session)
+    for day in {rows[move[0]].day for move in moves} | {move[1] for move in moves}:
+        occupancy_cache.invalidate(db=db, day=day)
+    return []
+
+def reschedule_class(session, timetable_id, new_day, new_start, new_end, new_classroom_id=None):
+    errors = reschedule_classes(session, [(timetable_id, new_day, new_start, new_end, new_classroom_id)])
+    for error in errors:
+        print(error)
+    if errors:
+        print("Conflict detected. Cannot reschedule.")
+        return
+    print("Rescheduling complete.")
+
+def _as_date(value):
+    """Midnight datetime for a date, datetime or 'YYYY-MM-DD' string."""
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value, '%Y-%m-%d')
+    return datetime.datetime(value.year, value.month, value.day)
+
+def _on_date(column, date):
+    # Range instead of equality, so the (date, ...) indexes are used and stray
+    # times of day still match
+    return (column >= date) & (column < date + datetime.timedelta(days=1))
+
+def _lessons_on(session, class_id, course_id, date):
+    """Weekly timetable rows of a class's course that fall on the weekday of date."""
+    return session.query(Timetable.start_time, Timetable.end_time, Timetable.classroom_id).filter(
+        live(), Timetable.class_id == class_id, Timetable.course_id == course_id,
+        Timetable.day == DAY_NAMES[date.weekday()]).all()
+
+def room_overlay(session, date):
+    """
+    How the cancellations and room changes recorded for date alter the weekly
+    timetable on that day: {(class_id, course_id, weekly room id): room id on
+    that date} for room changes and {(class_id, course_id): None} for
+    cancelled lessons; see _room_on(). The latest room change of a lesson wins,
+    and a cancellation overrides any room change.
+    """
+    date = _as_date(date)
+    overlay = {(row.class_id, row.course_id, row.old_room_id): row.new_room_id for row in session.query(
+        RoomChange.class_id, RoomChange.course_id, RoomChange.old_room_id, RoomChange.new_room_id
+    ).filter(_on_date(RoomChange.date, date)).order_by(RoomChange.id)}
+    for row in session.query(ClassCancellation.class_id, ClassCancellation.course_id).filter(
+            _on_date(ClassCancellation.date, date)):
+        overlay[(row.class_id, row.course_id)] = None
+    return overlay
+
+def _room_on(overlay, class_id, course_id, room_id):
+    """The room of a weekly lesson held in room_id on the overlay's date, None if it is cancelled."""
+    if (class_id, course_id) in overlay:
+        return None
+    return overlay.get((class_id, course_id, room_id), room_id)
+
+def _occupied_rooms(session, day, start_time, end_time, overlay=None, exclude=None):
+    """
+    Ids of the rooms booked at any time overlapping the slot. Without an
+    overlay this is served from occupancy_cache; with one, the overlapping
+    bookings are read directly so each lesson's room on that date is known.
+    """
+    week_start, week_end = week_interval(day, start_time, end_time)
+    if not overlay and exclude is None or week_start is None:
+        db = _db_key(session)
+        occupied, _ = occupancy_cache.get((db, day, start_time, end_time),
+                                          lambda keys: _load_slot_occupancy(session, db, keys),
+                                          _occupancy_stamp(session))
+        return occupied
+    overlay = overlay or {}
+    occupied = set()
+    for row in session.query(Timetable.class_id, Timetable.course_id, Timetable.classroom_id).filter(
+            live(), overlapping(week_start, week_end)):
+        if (row.class_id, row.course_id) != exclude:
+            room = _room_on(overlay, row.class_id, row.course_id, row.classroom_id)
+            if room is not None:
+                occupied.add(room)
+    return occupied
+
+def record_cancellation(session, class_id, course_id, date, reason=None, user_id=None):
+    """
+    Record that a class's lessons of a course do not take place on date.
+    Raises ValueError if the class has no such lesson on that weekday.
+    """
+    date = _as_date(date)
+    if not _lessons_on(session, class_id, course_id, date):
+        raise ValueError(f"No lesson of this course on {DAY_NAMES[date.weekday()]}.")
+    cancellation = ClassCancellation(class_id=class_id, course_id=course_id, date=date, reason=reason,
+                                     cancelled_by=user_id)
+    session.add(cancellation)
+    session.commit()
+    return cancellation
+
+def record_room_change(session, class_id, course_id, new_room_id, date, reason=None, user_id=None):
+    """
+    Move a class's lessons of a course to another room for date only. One
+    RoomChange is recorded per original room, taken from the weekly timetable,
+    and the list of them is returned. Raises ValueError if there is no such
+    lesson, the new room does not exist or has fewer seats than the class has
+    students, or it is busy at that time on that date.
+    """
+    date = _as_date(date)
+    lessons = _lessons_on(session, class_id, course_id, date)
+    if not lessons:
+        raise ValueError(f"No lesson of this course on {DAY_NAMES[date.weekday()]}.")
+    room = session.query(Classroom.name, Classroom.capacity).filter(Classroom.id == new_room_id).first()
+    if room is None:
+        raise ValueError(f"Classroom {new_room_id} not found.")
+    size = session.query(Class.size).filter(Class.id == class_id).scalar()
+    if size and (room.capacity or 0) < size:
+        raise ValueError(f"{room.name} has {room.capacity or 0} seats, too few for the class's {size} students.")
+    overlay = room_overlay(session, date)
+    for lesson in lessons:
+        occupied = _occupied_rooms(session, DAY_NAMES[date.weekday()], lesson.start_time, lesson.end_time, overlay,
+                                   exclude=(class_id, course_id))
+        if new_room_id in occupied:
+            raise ValueError(f"The room is already booked at {lesson.start_time}-{lesson.end_time} on that date.")
+    room_changes = [RoomChange(class_id=class_id, course_id=course_id, old_room_id=old_room_id,
+                               new_room_id=new_room_id, date=date, reason=reason, changed_by=user_id)
+                    for old_room_id in sorted({lesson.classroom_id for lesson in lessons})]
+    session.add_all(room_changes)
+    session.commit()
+    return room_changes
+
+def find_available_rooms(session, day, start_time, end_time, date=None, min_capacity=None):
+    """
+    Returns a list of available classrooms (id, name, capacity rows) for the
+    given day and time slot, smallest first. Occupancy comes from
+    occupancy_cache, so repeated lookups skip the timetable. With a date, the
+    day is that date's weekday and the cancellations and room changes recorded
+    for it are applied on top of the weekly timetable. min_capacity keeps the
+    rooms with at least that many seats, found by bisecting the capacity index.
+    """
+    overlay = None
+    if date is not None:
+        date = _as_date(date)
+        day = DAY_NAMES[date.weekday()]
+        overlay = room_overlay(session, date)
+    occupied = _occupied_rooms(session, day, start_time, end_time, overlay)
+    return [room for room in rooms_with_capacity(session, min_capacity) if room.id not in occupied]
+
+def suggest_reschedule_options(session, class_id, course_id, exclude_timetable_id=None):
+    """
+    Suggests alternative slots and rooms for a class/course, avoiding conflicts.
+    Optionally exclude a specific timetable entry (for rescheduling that entry).
+    Only rooms large enough for the class are offered, smallest first.
+    Returns a list of (day, start_time, end_time, classroom) tuples.
+    """
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    time_slots = [("09:00", "10:00"), ("10:00", "11:00"), ("11:00", "12:00")]
+    cct = session.query(ClassCourseTeacher.teacher_id).filter_by(class_id=class_id, course_id=course_id).first()
+    if not cct:
+        return []
+    teacher_id = cct.teacher_id
+    size = session.query(Class.size).filter(Class.id == class_id).scalar()
+    classrooms = rooms_with_capacity(session, size)
+
+    # Bookings of all candidate slots; cache misses are loaded in one query
+    db = _db_key(session)
+    keys = [(db, day, slot[0], slot[1]) for day in days for slot in time_slots]
+    occupancy = occupancy_cache.get_many(keys, lambda missing: _load_slot_occupancy(session, db, missing),
+                                         _occupancy_stamp(session))
+    excluded = None
+    if exclude_timetable_id:
+        excluded = session.query(
+            Timetable.week_start, Timetable.week_end, Timetable.classroom_id, Timetable.teacher_id
+        ).filter(live(), Timetable.id == exclude_timetable_id).first()
+
+    suggestions = []
+    for day in days:
+        for slot in time_slots:
+            busy_rooms, busy_teachers = occupancy[(db, day, slot[0], slot[1])]
+            slot_start, slot_end = week_interval(day, slot[0], slot[1])
+            if excluded and excluded.week_start is not None and slot_start is not None \
+                    and excluded.week_start < slot_end and excluded.week_end > slot_start:
+                # The entry being moved frees its own room and teacher
+                busy_rooms = busy_rooms - {excluded.classroom_id}
+                busy_teachers = busy_teachers - {excluded.teacher_id}
+            if teacher_id in busy_teachers:
+                continue
+            for classroom in classrooms:
+                if classroom.id not in busy_rooms:
+                    suggestions.append((day, slot[0], slot[1], classroom.name))
+    return suggestions
+
+def keyset_page(query, key, after=None, limit=50):
+    """
+    One page of query ordered by key, a unique indexed column, starting after
+    the key value `after`. Returns (rows, key of the last row, or None if this
+    is the last page). Unlike OFFSET, the cost does not grow with the page number.
+    """
+    if after is not None:
+        query = query.filter(key > after)
+    rows = query.order_by(key).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], key.key)
+
+def _timetable_filters(teacher_id=None, classroom_id=None, day=None):
+    conditions = []
+    if teacher_id is not None:
+        conditions.append(Timetable.teacher_id == teacher_id)
+    if classroom_id is not None:
+        conditions.append(Timetable.classroom_id == classroom_id)
+    if day is not None:
+        conditions.append(Timetable.day == day)
+    return conditions
+
+def class_page(session, after=None, limit=20, class_id=None, teacher_id=None, classroom_id=None, day=None):
+    """
+    Keyset page of class ids for the timetable view, keeping only the classes
+    with an entry matching the teacher, room and day filters.
+    Returns (class ids, next `after` value or None).
+    """
+    query = session.query(Class.id)
+    if class_id is not None:
+        query = query.filter(Class.id == class_id)
+    conditions = _timetable_filters(teacher_id, classroom_id, day)
+    if conditions:
+        # Correlated EXISTS, answered from the (version_id, class_id, week_start) index per class
+        query = query.filter(exists().where(live(), Timetable.class_id == Class.id, *conditions))
+    rows, next_after = keyset_page(query, Class.id, after, limit)
+    return [row.id for row in rows], next_after
+
+def timetable_grid(session, days, time_slots, class_ids=None, teacher_id=None, classroom_id=None, day=None):
+    """
+    Build {class name: {slot: {day: cell}}} from one joined query, for every
+    class or only class_ids. With teacher, room or day filters only the
+    matching entries fill cells.
+    Cells are "course<br>teacher<br>room" strings (None when free), as rendered by timetable.html.
+    """
+    rows = (
+        session.query(
+            Class.name.label('class_name'), Timetable.day, Timetable.start_time, Timetable.end_time,
+            Course.name.label('course_name'), Teacher.name.label('teacher_name'), Classroom.name.label('room_name'),
+        )
+        .select_from(Class)
+        .outerjoin(Timetable, and_(live(), Timetable.class_id == Class.id,
+                                   *_timetable_filters(teacher_id, classroom_id, day)))
+        .outerjoin(Course, Timetable.course_id == Course.id)
+        .outerjoin(Teacher, Timetable.teacher_id == Teacher.id)
+        .outerjoin(Classroom, Timetable.classroom_id == Classroom.id)
+        .order_by(Class.id)
+    )
+    if class_ids is not None:
+        rows = rows.filter(Class.id.in_(class_ids))
+    timetable_data = {}
+    for row in rows:
+        grid = timetable_data.get(row.class_name)
+        if grid is None:
+            grid = timetable_data[row.class_name] = {slot: {day: None for day in days} for slot in time_slots}
+        slot = (row.start_time, row.end_time)
+        if slot in grid and row.day in grid[slot]:
+            grid[slot][row.day] = f"{row.course_name}<br>{row.teacher_name}<br>{row.room_name}"
+    return timetable_data
+
+def print_timetable(session):
+    timetables = session.query(Timetable).options(
+        joinedload(Timetable.class_), joinedload(Timetable.classroom),
+        joinedload(Timetable.course), joinedload(Timetable.teacher),
+    ).filter(live()).order_by(Timetable.id)
+    for t in timetables:
+        print(t)
+
+if __name__ == "__main__":
+    session = get_session()
+    # Example usage
+    # Add classrooms
+    if not session.query(Classroom).first():
+        add_classroom(session, "Room 101", 40)
+        add_classroom(session, "Room 102", 30)
+    # Add courses
+    if not session.query(Course).first():
+        add_course(session, "Mathematics")
+        add_course(session, "Physics")
+    # Add teachers
+    if not session.query(Teacher).first():
+        add_teacher(session, "Alice", "Mathematics")
+        add_teacher(session, "Bob", "Physics")
+    # Add classes with one teacher per course
+    if not session.query(Class).first():
+        # Map: {course_id: teacher_id}
+        add_class(session, "FYBSc", {1: 1})  # Mathematics by Alice
+        add_class(session, "SYBSc", {2: 2})  # Physics by Bob
+    # Generate timetable
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    time_slots = [("09:00", "10:00"), ("10:00", "11:00"), ("11:00", "12:00")]
+    summary = generate_timetable(session, days, time_slots)
+    print("\nTimetable Summary:")
+    for line in summary:
+        print(line)
+    print("\nFull Timetable:")
+    print_timetable(session)
+
+    # Example: Find available rooms for extra class
+    print("\nAvailable rooms for extra class on Monday 10:00-11:00:")
+    available_rooms = find_available_rooms(session, "Monday", "10:00", "11:00")
+    for room in available_rooms:
+        print(room)
+
+    # Example: Suggest reschedule options for FYBSc Mathematics
+    fybsc = session.query(Class).filter_by(name="FYBSc").first()
+    if fybsc:
+        print("\nReschedule options for FYBSc Mathematics:")
+        options = suggest_reschedule_options(session, fybsc.id, 1)
+        for opt in options:
+            print(f"Day: {opt[0]}, Time: {opt[1]}-{opt[2]}, Room: {opt[3]}")
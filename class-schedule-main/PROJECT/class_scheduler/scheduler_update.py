@@ -0,0 +1,3 @@
+# User now lives in scheduler.py on the shared Base, so there is one users
+# table mapping for the whole application
+from .scheduler import User  # noqa: F401
@@ -0,0 +1,544 @@
+"""
+Timetable search strategies.
+
+A problem is plain data: a list of lessons ``(class_id, course_id, teacher_id)``,
+the days, the time slots and the room ids, optionally with the room capacities
+(ascending, in room order), the class sizes and per-teacher load limits. A
+course taught for several periods a week appears once per period. A class is
+only placed in a room it fits in, and always in the smallest free one; periods
+of the same course go to different days where possible. A strategy returns one
+placement per lesson, either ``(cell, room_index)`` on the occupancy grid or
+None when the lesson could not be scheduled, together with a dict of statistics.
+
+Strategies are registered in ``STRATEGIES`` and selected by name through
+``generate_timetable(..., strategy=...)``:
+
+- ``greedy``: first fit in day/slot/room order (fast, never backtracks)
+- ``solver``: most-constrained-variable backtracking to a first feasible
+  schedule, then simulated annealing on the schedule quality until the time
+  budget runs out
+
+``solve_multistart`` runs several shuffled orderings of the same problem in a
+process pool and keeps the best-scoring result.
+
+Both accept a ``progress(placed, conflicts)`` callback, called every
+PROGRESS_EVERY steps of the search (and after each start of a multi-start run)
+with the number of lessons placed so far and the conflicts met.
+"""
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .occupancy import Occupancy, lowest_bit
+
+DEFAULT_TIME_BUDGET = 5.0  # seconds
+UNSCHEDULED_PENALTY = 1000
+PROGRESS_EVERY = 256  # search steps between progress callbacks
+
+
+def _new_stats(strategy):
+    return {
+        'strategy': strategy,
+        'nodes': 0,
+        'conflicts': 0,
+        'backtracks': 0,
+        'iterations': 0,
+        'accepted_moves': 0,
+        'first_feasible': None,
+        'elapsed': 0.0,
+        'unscheduled': 0,
+        'score': 0,
+    }
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Quality scoring -----------------------------------------------------------
+
+def teacher_cost(occupancy, cells):
+    """Idle slots between a teacher's first and last lesson, summed over days."""
+    n_slots = len(occupancy.time_slots)
+    day_mask = (1 << n_slots) - 1
+    gaps = 0
+    for d in range(len(occupancy.days)):
+        slots = (cells >> (d * n_slots)) & day_mask
+        if slots:
+            first = lowest_bit(slots)
+            last = slots.bit_length() - 1
+            gaps += last - first + 1 - slots.bit_count()
+    return gaps
+
+
+def day_overload(occupancy, cells):
+    """Lessons above an even per-day spread of ``cells``."""
+    n_days = len(occupancy.days)
+    target = math.ceil(cells.bit_count() / n_days) if n_days else 0
+    return sum(max(0, (cells & mask).bit_count() - target) for mask in occupancy.day_masks)
+
+
+def class_cost(occupancy, cells, rooms):
+    """Lessons above an even per-day spread, plus every extra room the class moves between."""
+    return day_overload(occupancy, cells) + max(0, len(+rooms) - 1)
+
+
+def days_used(occupancy, cells):
+    """Mask of every cell on the days that ``cells`` touches."""
+    used = 0
+    for mask in occupancy.day_masks:
+        if cells & mask:
+            used |= mask
+    return used
+
+
+def course_cells_of(pinned):
+    """(class_id, course_id) -> bitmask of the cells its pinned lessons hold."""
+    cells = {}
+    for cell, _, _, class_id, course_id in pinned:
+        cells[(class_id, course_id)] = cells.get((class_id, course_id), 0) | 1 << cell
+    return cells
+
+
+def score(occupancy, placements, class_rooms, course_cells=None):
+    """
+    Lower is better: unscheduled lessons dominate, then teacher gaps, day
+    overload, room spread and periods of one course bunched on the same day.
+    """
+    total = UNSCHEDULED_PENALTY * sum(1 for p in placements if p is None)
+    total += sum(teacher_cost(occupancy, cells) for cells in occupancy.teachers.values())
+    total += sum(class_cost(occupancy, cells, class_rooms.get(class_id, Counter()))
+                 for class_id, cells in occupancy.classes.items())
+    total += sum(day_overload(occupancy, cells) for cells in (course_cells or {}).values())
+    return total
+
+
+# Strategies ----------------------------------------------------------------
+
+def _no_progress(placed, conflicts):
+    pass
+
+
+def greedy(lessons, occupancy, deadline, rng, stats, course_cells, report=_no_progress):
+    course_cells = dict(course_cells)
+    placements = []
+    for class_id, course_id, teacher_id in lessons:
+        stats['nodes'] += 1
+        if not stats['nodes'] % PROGRESS_EVERY:
+            report(len(placements) - stats['conflicts'], stats['conflicts'])
+        key = (class_id, course_id)
+        fit = occupancy.first_fit(teacher_id, class_id, days_used(occupancy, course_cells.get(key, 0)))
+        if fit is None:
+            stats['conflicts'] += 1
+            placements.append(None)
+            continue
+        occupancy.place(fit[0], fit[1], teacher_id, class_id)
+        course_cells[key] = course_cells.get(key, 0) | 1 << fit[0]
+        placements.append(fit)
+    return placements
+
+
+class _Search:
+    """Mutable state for the constraint solver: placements plus who holds each room/teacher/class cell."""
+
+    def __init__(self, lessons, occupancy, course_cells, report=_no_progress):
+        self.lessons = lessons
+        self.report = report
+        self.occupancy = occupancy
+        self.placements = [None] * len(lessons)
+        self.unscheduled = len(lessons)
+        self.room_owner = {}     # (cell, room) -> lesson
+        self.teacher_owner = {}  # (teacher_id, cell) -> lesson
+        self.class_owner = {}    # (class_id, cell) -> lesson
+        self.class_rooms = {class_id: Counter() for class_id, _, _ in lessons}
+        self.course_cells = dict(course_cells)  # (class_id, course_id) -> cells of its placed periods
+
+    def place(self, i, cell, room):
+        class_id, course_id, teacher_id = self.lessons[i]
+        self.occupancy.place(cell, room, teacher_id, class_id)
+        self.placements[i] = (cell, room)
+        self.unscheduled -= 1
+        self.room_owner[(cell, room)] = i
+        self.teacher_owner[(teacher_id, cell)] = i
+        self.class_owner[(class_id, cell)] = i
+        self.class_rooms[class_id][room] += 1
+        self.course_cells[(class_id, course_id)] = self.course_cells.get((class_id, course_id), 0) | 1 << cell
+
+    def unplace(self, i):
+        class_id, course_id, teacher_id = self.lessons[i]
+        cell, room = self.placements[i]
+        self.occupancy.release(cell, room, teacher_id, class_id)
+        self.placements[i] = None
+        self.unscheduled += 1
+        del self.room_owner[(cell, room)]
+        del self.teacher_owner[(teacher_id, cell)]
+        del self.class_owner[(class_id, cell)]
+        self.class_rooms[class_id][room] -= 1
+        self.course_cells[(class_id, course_id)] &= ~(1 << cell)
+
+    def domain(self, i):
+        class_id, _, teacher_id = self.lessons[i]
+        return self.occupancy.free_cells(teacher_id, class_id)
+
+    def candidates(self, i):
+        """Free cells of lesson i, on days without another period of its course first."""
+        class_id, course_id, _ = self.lessons[i]
+        domain = self.domain(i)
+        used = days_used(self.occupancy, self.course_cells.get((class_id, course_id), 0))
+        return list(_bits(domain & ~used)) + list(_bits(domain & used))
+
+    def cost(self, lesson_ids):
+        """Quality cost of the teachers and classes of the given lessons."""
+        occupancy = self.occupancy
+        teachers = {self.lessons[i][2] for i in lesson_ids}
+        classes = {self.lessons[i][0] for i in lesson_ids}
+        courses = {self.lessons[i][:2] for i in lesson_ids}
+        total = sum(teacher_cost(occupancy, occupancy.teachers.get(t, 0)) for t in teachers)
+        total += sum(class_cost(occupancy, occupancy.classes.get(c, 0), self.class_rooms[c]) for c in classes)
+        total += sum(day_overload(occupancy, self.course_cells.get(key, 0)) for key in courses)
+        return total
+
+    def score(self):
+        return score(self.occupancy, self.placements, self.class_rooms, self.course_cells)
+
+    def restore(self, placements):
+        for i, placed in enumerate(self.placements):
+            if placed is not None:
+                self.unplace(i)
+        for i, placed in enumerate(placements):
+            if placed is not None:
+                self.place(i, *placed)
+
+
+def _construct(search, deadline, max_nodes, stats, started):
+    """
+    Depth-first search that always branches on the most constrained lesson
+    (fewest free cells), bounded by max_nodes. Leaves the deepest, ideally
+    complete, assignment it reached in ``search``.
+    """
+    unassigned = set(range(len(search.lessons)))
+    stack = []  # [lesson, candidate cells, next candidate]
+    best, best_depth = [], 0
+
+    while stats['nodes'] < max_nodes and time.perf_counter() < deadline:
+        if not unassigned:
+            stats['first_feasible'] = time.perf_counter() - started
+            return
+
+        var, size = None, None
+        for i in unassigned:
+            free = search.domain(i).bit_count()
+            if size is None or free < size:
+                var, size = i, free
+                if not free:
+                    break
+
+        if size:
+            stack.append([var, search.candidates(var), 0])
+            unassigned.discard(var)
+        else:
+            stats['conflicts'] += 1
+
+        # Place the next candidate of the top frame, backtracking over exhausted frames
+        while stack:
+            frame = stack[-1]
+            var, candidates, pos = frame
+            if search.placements[var] is not None:
+                search.unplace(var)
+            if pos < len(candidates):
+                cell = candidates[pos]
+                search.place(var, cell, search.occupancy.free_room(cell, search.lessons[var][0]))
+                frame[2] = pos + 1
+                stats['nodes'] += 1
+                if not stats['nodes'] % PROGRESS_EVERY:
+                    search.report(len(search.lessons) - search.unscheduled, stats['conflicts'])
+                break
+            stack.pop()
+            unassigned.add(var)
+            stats['backtracks'] += 1
+        else:
+            break  # search space exhausted
+
+        if len(stack) > best_depth:
+            best, best_depth = list(search.placements), len(stack)
+
+    if unassigned and best:
+        search.restore(best)
+
+
+def _anneal(search, deadline, rng, stats, max_iterations, started):
+    """
+    Simulated annealing over single-lesson moves. An unscheduled lesson with no
+    free cell may evict whatever blocks a random cell (min-conflicts style), so
+    the search can keep trading unscheduled lessons until everything fits.
+    The best schedule seen is kept.
+    """
+    occupancy = search.occupancy
+    n = len(search.lessons)
+    current_score = search.score()
+    best_score, best = current_score, list(search.placements)
+    temperature = 2.0
+    cooling = 0.9995
+
+    for _ in range(max_iterations):
+        if not current_score or time.perf_counter() > deadline:
+            break
+        stats['iterations'] += 1
+        if not stats['iterations'] % PROGRESS_EVERY:
+            search.report(n - search.unscheduled, stats['conflicts'])
+        temperature = max(temperature * cooling, 0.05)
+        i = rng.randrange(n)
+        class_id, _, teacher_id = search.lessons[i]
+        old = search.placements[i]
+        evicted = []
+
+        if old is not None:
+            before = search.cost([i])
+            search.unplace(i)
+            domain = search.domain(i)
+            if not domain:
+                search.place(i, *old)
+                continue
+            cell = rng.choice(list(_bits(domain)))
+        else:
+            domain = search.domain(i)
+            if domain:
+                cell = rng.choice(list(_bits(domain)))
+            elif occupancy.room_ids and occupancy.n_cells:
+                cell = rng.randrange(occupancy.n_cells)
+                stats['conflicts'] += 1
+                blockers = set()
+                for owners, key, busy in ((search.teacher_owner, teacher_id, occupancy.teachers),
+                                          (search.class_owner, class_id, occupancy.classes)):
+                    if busy.get(key, 0) >> cell & 1:
+                        blockers.add(owners.get((key, cell)))
+                if None in blockers:
+                    continue  # blocked by a pinned placement
+                evicted = sorted(blockers)
+                free = occupancy.free_rooms(cell, class_id)
+                for j in evicted:
+                    if occupancy.fits(search.placements[j][1], class_id):
+                        free |= 1 << search.placements[j][1]
+                if not free:
+                    floor = occupancy.class_floor.get(class_id, 0)
+                    if floor >= len(occupancy.room_ids):
+                        continue  # no room is large enough
+                    j = search.room_owner.get((cell, rng.randrange(floor, len(occupancy.room_ids))))
+                    if j is None:
+                        continue
+                    evicted.append(j)
+            else:
+                continue
+            before = search.cost(evicted + [i])
+
+        moved = [(j, search.placements[j]) for j in evicted]
+        for j in evicted:
+            search.unplace(j)
+        if not occupancy.free_cells(teacher_id, class_id) >> cell & 1:
+            # Still closed, by the teacher's load limit
+            for j, placed in moved:
+                search.place(j, *placed)
+            continue
+        search.place(i, cell, occupancy.free_room(cell, class_id))
+        delta = search.cost(evicted + [i]) - before + UNSCHEDULED_PENALTY * (len(evicted) - (old is None))
+
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            stats['accepted_moves'] += 1
+            current_score += delta
+            if current_score < best_score:
+                best_score, best = current_score, list(search.placements)
+            if stats['first_feasible'] is None and not search.unscheduled:
+                stats['first_feasible'] = time.perf_counter() - started
+            continue
+
+        # Rejected: undo
+        search.unplace(i)
+        for j, placed in moved:
+            search.place(j, *placed)
+        if old is not None:
+            search.place(i, *old)
+
+    if best_score < current_score:
+        search.restore(best)
+
+
+def constraint_solver(lessons, occupancy, deadline, rng, stats, course_cells, report=_no_progress):
+    started = time.perf_counter()
+    initial = occupancy.copy()  # pinned placements only
+    search = _Search(lessons, occupancy, course_cells, report)
+    # Spend at most half of the budget on the constructive search
+    construct_deadline = started + (deadline - started) / 2
+    _construct(search, construct_deadline, 10 * len(lessons) + 1000, stats, started)
+
+    # Whatever the tree search could not reach is tried first-fit
+    for i, (class_id, course_id, teacher_id) in enumerate(lessons):
+        if search.placements[i] is None:
+            used = days_used(occupancy, search.course_cells.get((class_id, course_id), 0))
+            fit = occupancy.first_fit(teacher_id, class_id, used)
+            if fit is not None:
+                search.place(i, *fit)
+
+    # Plain first fit packs rooms tightly; start from it if it got further
+    if search.unscheduled:
+        baseline_stats = _new_stats('greedy')
+        baseline = greedy(lessons, initial, deadline, rng, baseline_stats, course_cells)
+        if baseline_stats['conflicts'] < search.unscheduled:
+            search.restore(baseline)
+            if not search.unscheduled:
+                stats['first_feasible'] = time.perf_counter() - started
+
+    stats['initial_score'] = search.score()
+    _anneal(search, deadline, rng, stats, 200 * len(lessons), started)
+    return search.placements
+
+
+STRATEGIES = {
+    'greedy': greedy,
+    'solver': constraint_solver,
+}
+
+
+def _occupancy(days, time_slots, room_ids, pinned, capacities, class_sizes, teacher_limits):
+    occupancy = Occupancy(days, time_slots, room_ids, capacities)
+    for class_id, size in (class_sizes or {}).items():
+        occupancy.set_class_size(class_id, size)
+    for teacher_id, (daily, weekly) in (teacher_limits or {}).items():
+        occupancy.set_teacher_limits(teacher_id, daily, weekly)
+    for cell, room, teacher_id, class_id, _ in pinned:
+        occupancy.place(cell, room, teacher_id, class_id)
+    return occupancy
+
+
+def solve(lessons, days, time_slots, room_ids, strategy='greedy', time_budget=None, seed=None, pinned=(),
+          capacities=None, class_sizes=None, teacher_limits=None, progress=None):
+    """
+    Run a strategy over plain problem data. ``pinned`` lists
+    ``(cell, room_index, teacher_id, class_id, course_id)`` placements that are
+    already fixed; the strategy schedules the lessons around them.
+    ``capacities`` are the room capacities in room_ids order (ascending) and
+    ``class_sizes`` maps class ids to head counts; classes without a size fit
+    any room. ``teacher_limits`` maps teacher ids to (max lessons per day, max
+    lessons per week), either of which may be None.
+    Returns (occupancy, placements, stats).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown scheduling strategy: {strategy}")
+    stats = _new_stats(strategy)
+    occupancy = _occupancy(days, time_slots, room_ids, pinned, capacities, class_sizes, teacher_limits)
+    course_cells = course_cells_of(pinned)
+    started = time.perf_counter()
+    deadline = started + (DEFAULT_TIME_BUDGET if time_budget is None else time_budget)
+    placements = STRATEGIES[strategy](lessons, occupancy, deadline, random.Random(seed), stats, course_cells,
+                                      progress or _no_progress)
+
+    class_rooms = {}
+    for cell, room, teacher_id, class_id, _ in pinned:
+        class_rooms.setdefault(class_id, Counter())[room] += 1
+    for (class_id, course_id, _), placed in zip(lessons, placements):
+        if placed is not None:
+            class_rooms.setdefault(class_id, Counter())[placed[1]] += 1
+            course_cells[(class_id, course_id)] = course_cells.get((class_id, course_id), 0) | 1 << placed[0]
+    stats['elapsed'] = time.perf_counter() - started
+    stats['unscheduled'] = sum(1 for p in placements if p is None)
+    stats['score'] = score(occupancy, placements, class_rooms, course_cells)
+    if stats['first_feasible'] is None and not stats['unscheduled']:
+        stats['first_feasible'] = stats['elapsed']
+    if progress:
+        progress(len(lessons) - stats['unscheduled'], stats['conflicts'])
+    return occupancy, placements, stats
+
+
+def _run_start(lessons, days, time_slots, room_ids, strategy, time_budget, start_seed, pinned=(), capacities=None,
+               class_sizes=None, teacher_limits=None):
+    """
+    One multi-start run (executed in a worker process). A start_seed of None
+    keeps the given lesson order; otherwise the order is shuffled with it.
+    Returns (placements in the original lesson order, stats).
+    """
+    order = list(range(len(lessons)))
+    if start_seed is not None:
+        random.Random(start_seed).shuffle(order)
+    _, placements, stats = solve([lessons[i] for i in order], days, time_slots, room_ids,
+                                 strategy=strategy, time_budget=time_budget, seed=start_seed, pinned=pinned,
+                                 capacities=capacities, class_sizes=class_sizes, teacher_limits=teacher_limits)
+    result = [None] * len(lessons)
+    for position, i in enumerate(order):
+        result[i] = placements[position]
+    stats['start_seed'] = start_seed
+    return result, stats
+
+
+def solve_multistart(lessons, days, time_slots, room_ids, strategy='greedy', time_budget=None, seed=None,
+                     starts=4, workers=None, pinned=(), capacities=None, class_sizes=None, teacher_limits=None,
+                     progress=None):
+    """
+    Fan ``starts`` orderings of the lessons out over ``workers`` processes
+    (default: one per CPU) and keep the result with the lowest score. The first
+    start uses the original order, the others are shuffled from ``seed``.
+    time_budget is the wall-clock budget for the whole fan-out; starts still
+    running when it expires are dropped. workers is capped at the CPU count.
+    Returns (occupancy, placements, stats) like ``solve``.
+    """
+    cpus = os.cpu_count() or 1
+    starts = max(1, starts)
+    workers = max(1, min(workers or cpus, cpus, starts))
+    wall_budget = DEFAULT_TIME_BUDGET if time_budget is None else time_budget
+    # Each start gets its share of the budget for the number of waves it runs in
+    waves = math.ceil(starts / workers)
+    start_budget = wall_budget / waves
+    base_seed = random.randrange(2 ** 32) if seed is None else seed
+    start_seeds = [None] + [base_seed * 1000003 + k for k in range(1, starts)]
+
+    started = time.perf_counter()
+    results = []
+
+    def collect(new_results):
+        results.extend(new_results)
+        if progress and results:
+            best = min(result[1]['unscheduled'] for result in results)
+            progress(len(lessons) - best, sum(result[1]['conflicts'] for result in results))
+
+    if workers <= 1:
+        for start_seed in start_seeds:
+            if results and time.perf_counter() - started > wall_budget:
+                break
+            collect([_run_start(lessons, days, time_slots, room_ids, strategy, start_budget, start_seed, pinned,
+                                capacities, class_sizes, teacher_limits)])
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = {pool.submit(_run_start, lessons, days, time_slots, room_ids, strategy, start_budget, start_seed,
+                                   pinned, capacities, class_sizes, teacher_limits)
+                       for start_seed in start_seeds}
+            # Allow a little slack over the budget for process start-up and pickling
+            deadline = started + wall_budget + 1.0
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                     return_when=FIRST_COMPLETED)
+                collect([future.result() for future in done])
+                if not done:
+                    break
+        finally:
+            # Do not wait for the dropped starts: queued ones are cancelled and
+            # running ones end within their own start_budget
+            pool.shutdown(wait=False, cancel_futures=True)
+        if not results:
+            collect([_run_start(lessons, days, time_slots, room_ids, 'greedy', None, None, pinned,
+                                capacities, class_sizes, teacher_limits)])
+
+    placements, stats = min(results, key=lambda result: (result[1]['score'], result[1]['elapsed']))
+    occupancy = _occupancy(days, time_slots, room_ids, pinned, capacities, class_sizes, teacher_limits)
+    for (class_id, _, teacher_id), placed in zip(lessons, placements):
+        if placed is not None:
+            occupancy.place(placed[0], placed[1], teacher_id, class_id)
+    stats['starts'] = len(results)
+    stats['workers'] = workers
+    stats['scores'] = sorted(result[1]['score'] for result in results)
+    stats['elapsed'] = time.perf_counter() - started
+    return occupancy, placements, stats
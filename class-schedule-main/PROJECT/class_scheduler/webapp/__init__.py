@@ -0,0 +1 @@
+"""The Flask web application; see app.py."""
@@ -0,0 +1,520 @@
+import os
+import time
+from datetime import datetime
+
+from flask import Flask, Response, abort, render_template, request, redirect, url_for, flash, jsonify, g, stream_with_context
+from ..scheduler import get_engine, get_sessionmaker, add_classroom, add_course, add_teacher, add_class, timetable_grid, class_page, keyset_page, cached_user, invalidate_users, publish_version, published_version_id, rollback_timetable, diff_versions, reference_data, find_available_rooms, suggest_reschedule_options, record_cancellation, record_room_change, occupancy_cache, Course, Teacher, Class, Classroom, TimetableVersion, User
+from ..importer import import_csv
+from ..exporters import MIMETYPES, export, timetable_rows
+from ..jobs import JobQueue
+from ..solver import STRATEGIES
+from .. import instrumentation
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, scoped_session
+from flask import session as flask_session
+from io import TextIOWrapper
+
+app = Flask(__name__)
+app.secret_key = os.environ.get('SECRET_KEY', 'dev_secret_key')
+app.secret_key = 'your_secret_key'  # Change this to a random secret key
+DATABASE_URL = os.environ.get('SCHEDULER_DATABASE_URL', 'sqlite:///scheduler.db')
+# One session per request thread, drawn from the shared engine's connection pool.
+# The engine (and the schema check) is created by the first request, not on import.
+def _new_session():
+    return get_sessionmaker(DATABASE_URL)()
+
+session = scoped_session(_new_session)
+
+@app.teardown_appcontext
+def remove_session(exc=None):
+    session.remove()
+
+# Opt-in instrumentation: SQL counts and timings per request, served on /metrics
+# and, with SCHEDULER_REQUEST_LOG=1, logged once per request
+REQUEST_LOG = os.environ.get('SCHEDULER_REQUEST_LOG') == '1'
+if os.environ.get('SCHEDULER_INSTRUMENTATION') == '1' or REQUEST_LOG:
+    instrumentation.enable()
+    instrumentation.track_sql(get_engine(DATABASE_URL))
+
+@app.before_request
+def start_request_scope():
+    if instrumentation.enabled:
+        g.request_scope = instrumentation.Scope(request.endpoint or 'unknown').start()
+
+@app.after_request
+def log_request(response):
+    measured = g.get('request_scope')
+    if REQUEST_LOG and measured is not None:
+        app.logger.info("%s %s %s %.1fms sql=%d sql_time=%.1fms", request.method, request.path, response.status_code,
+                        (time.perf_counter() - measured.started) * 1000, measured.statements,
+                        measured.sql_seconds * 1000)
+    return response
+
+@app.teardown_request
+def finish_request_scope(exc=None):
+    measured = g.pop('request_scope', None)
+    if measured is not None:
+        measured.finish()
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+# Keyset page sizes of the timetable (classes) and of the directory lists
+TIMETABLE_PAGE_SIZE = 20
+DIRECTORY_PAGE_SIZE = 50
+# 8am to 6pm, 1 hour slots
+TIME_SLOTS = [(f"{h:02d}:00", f"{h+1:02d}:00") for h in range(8, 18)]
+
+# Upper limits for the generation options a request may ask for
+MAX_STARTS = 32
+MAX_TIME_BUDGET = 300.0  # seconds
+
+# Timetable generations are queued in the database and run one at a time by a
+# worker thread (see jobs.py), started by the first request; progress is
+# streamed to the browser over SSE
+generation_jobs = JobQueue(DATABASE_URL, DAYS, TIME_SLOTS)
+
+@app.before_request
+def start_generation_worker():
+    generation_jobs.start()
+
+# Jinja filter to assign a color class to each course
+def course_color_class(cell):
+    if not cell:
+        return ''
+    # Use the course name as a key for color assignment
+    course_name = cell.split('<br>')[0] if '<br>' in cell else cell
+    # Simple hash for color assignment
+    idx = abs(hash(course_name)) % 10
+    return f'course-color-{idx}'
+
+app.jinja_env.filters['course_color_class'] = course_color_class
+
+# Ensure current_user and helper functions are available in templates
+@app.context_processor
+def inject_template_globals():
+    context = {}
+    context['current_user'] = current_user()
+    
+    # Add helper functions to template context
+    context['get_teachers'] = get_teachers
+    context['get_courses'] = get_courses
+    context['get_classes'] = get_classes
+    context['get_classrooms'] = get_classrooms
+    
+    return context
+
+def current_user():
+    """The logged-in user as a cached UserSummary (see scheduler.cached_user), looked up once per request."""
+    if 'current_user' not in g:
+        user_id = flask_session.get('user_id')
+        g.current_user = cached_user(session, user_id) if user_id is not None else None
+    return g.current_user
+
+# Dropdown data: cached (id, name, ...) rows, see scheduler.reference_data
+def get_courses():
+    return reference_data(session, Course)
+
+def get_teachers():
+    return reference_data(session, Teacher)
+
+def get_classes():
+    return reference_data(session, Class)
+
+def get_classrooms():
+    return reference_data(session, Classroom)
+
+def import_upload(kind, file):
+    """Stream an uploaded CSV through importer.import_csv and flash the report."""
+    report = import_csv(session, kind, TextIOWrapper(file, encoding='utf-8-sig'))
+    flash(f"{report.summary()}.", 'warning' if report.errors else 'success')
+    for line, message in report.errors[:10]:
+        flash(f"Line {line}: {message}", 'danger')
+    if len(report.errors) > 10:
+        flash(f"...and {len(report.errors) - 10} more rows with errors.", 'danger')
+    return report
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/add_classroom', methods=['GET', 'POST'])
+def add_classroom_route():
+    if request.method == 'POST':
+        if 'csv_file' in request.files:
+            file = request.files['csv_file']
+            if file.filename.endswith('.csv'):
+                import_upload('classrooms', file)
+                return redirect(url_for('index'))
+        # fallback for manual (should not happen)
+        name = request.form.get('name')
+        capacity = request.form.get('capacity')
+        if name and capacity:
+            add_classroom(session, name, int(capacity))
+            return redirect(url_for('index'))
+    return render_template('add_classroom.html')
+
+def _period_limit(field, label):
+    """An optional teacher limit: None when empty, else a whole number of at least 1, as the CSV importer accepts."""
+    value = request.form.get(field, '').strip()
+    if not value:
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"Invalid {label} {value!r}")
+    return int(value)
+
+@app.route('/add_teacher', methods=['GET', 'POST'])
+def add_teacher_route():
+    if request.method == 'POST':
+        if 'csv_file' in request.files:
+            file = request.files['csv_file']
+            if file.filename.endswith('.csv'):
+                import_upload('teachers', file)
+                return redirect(url_for('index'))
+        # fallback for manual (should not happen)
+        name = request.form.get('name')
+        subject = request.form.get('subject')
+        if name and subject:
+            try:
+                add_teacher(session, name, subject, _period_limit('max_daily_periods', 'max daily periods'),
+                            _period_limit('max_weekly_periods', 'max weekly periods'))
+            except ValueError as exc:
+                flash(f"{exc}.", 'danger')
+            return redirect(url_for('index'))
+    return render_template('add_teacher.html', courses=get_courses())
+
+@app.route('/add_course', methods=['GET', 'POST'])
+def add_course_route():
+    if request.method == 'POST':
+        if 'csv_file' in request.files:
+            file = request.files['csv_file']
+            if file.filename.endswith('.csv'):
+                import_upload('courses', file)
+                return redirect(url_for('index'))
+        name = request.form.get('name')
+        if name:
+            add_course(session, name)
+            return redirect(url_for('index'))
+    return render_template('add_course.html')
+
+@app.route('/add_class', methods=['GET', 'POST'])
+def add_class_route():
+    if request.method == 'POST':
+        if 'csv_file' in request.files:
+            file = request.files['csv_file']
+            if file.filename.endswith('.csv'):
+                import_upload('classes', file)
+                return redirect(url_for('index'))
+        name = request.form.get('name')
+        size = request.form.get('size')
+        if name:
+            add_class(session, name, {}, size=int(size) if size else None)
+            return redirect(url_for('index'))
+    return render_template('add_class.html', courses=get_courses(), teachers=get_teachers())
+
+@app.route('/timetable')
+def timetable_route():
+    # Read-only: renders one page of the stored timetable, never regenerates it
+    # Classes and teachers are looked up by their unique (indexed) names, so
+    # the page does not carry a dropdown of every class and teacher
+    filters = {key: request.args[key].strip() for key in ('class', 'teacher', 'classroom_id', 'day')
+               if request.args.get(key, '').strip()}
+    class_id = teacher_id = None
+    if 'class' in filters:
+        class_id = session.query(Class.id).filter_by(name=filters['class']).scalar() or 0
+    if 'teacher' in filters:
+        teacher_id = session.query(Teacher.id).filter_by(name=filters['teacher']).scalar() or 0
+    classroom_id = request.args.get('classroom_id', type=int)
+    day = filters.get('day') if filters.get('day') in DAYS else None
+    class_ids, next_after = class_page(session, request.args.get('after', type=int), TIMETABLE_PAGE_SIZE,
+                                       class_id=class_id, teacher_id=teacher_id, classroom_id=classroom_id, day=day)
+    timetable_data = timetable_grid(session, DAYS, TIME_SLOTS, class_ids=class_ids, teacher_id=teacher_id,
+                                    classroom_id=classroom_id, day=day)
+    return render_template('timetable.html', timetable_data=timetable_data, days=[day] if day else DAYS,
+                           all_days=DAYS, time_slots=TIME_SLOTS, generation=generation_jobs.latest() or {'state': 'idle'},
+                           filters=filters, next_after=next_after, paged=request.args.get('after') is not None)
+
+def _clamped(value, low, high):
+    """value limited to [low, high]; None if it is missing or NaN."""
+    if value is None or value != value:
+        return None
+    return min(max(value, low), high)
+
+@app.route('/generate_timetable', methods=['POST'])
+def generate_timetable_route():
+    # A generation publishes a new live timetable, like the version actions
+    if not admin_user():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('timetable_route'))
+    strategy = request.form.get('strategy', 'greedy')
+    if strategy not in STRATEGIES:
+        flash(f'Unknown scheduling strategy: {strategy}', 'danger')
+        return redirect(url_for('timetable_route'))
+    options = {
+        'strategy': strategy,
+        'time_budget': _clamped(request.form.get('time_budget', type=float), 0.0, MAX_TIME_BUDGET),
+        'starts': _clamped(request.form.get('starts', 1, type=int), 1, MAX_STARTS),
+        'workers': _clamped(request.form.get('workers', type=int), 1, os.cpu_count() or 1),
+        'incremental': request.form.get('incremental') == '1',
+        'publish': request.form.get('review') != '1',
+    }
+    job, created = generation_jobs.submit(options, admin_user().id)
+    if created:
+        flash('Timetable generation queued.', 'success')
+    else:
+        flash('The same timetable generation is already queued or running.', 'warning')
+    return redirect(url_for('timetable_route'))
+
+@app.route('/generate_timetable/status')
+def generate_timetable_status():
+    job_id = request.args.get('job', type=int)
+    job = generation_jobs.get(job_id) if job_id else generation_jobs.latest()
+    return jsonify(job or {'state': 'idle'})
+
+@app.route('/generate_timetable/<int:job_id>/events')
+def generate_timetable_events(job_id):
+    """Server-Sent Events with the job's state and progress until it finishes."""
+    return Response(stream_with_context(generation_jobs.events(job_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/export/timetable.<fmt>')
+def export_timetable(fmt):
+    """
+    Stream the timetable as CSV, NDJSON or ICS. Optional query arguments:
+    class_id or teacher_id to export one calendar, start (YYYY-MM-DD) for the
+    first week of the ICS events, version to export an unpublished or earlier
+    timetable version.
+    """
+    if fmt not in MIMETYPES:
+        abort(404)
+    class_id = request.args.get('class_id', type=int)
+    teacher_id = request.args.get('teacher_id', type=int)
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+    except ValueError:
+        abort(400)
+    name = 'Timetable'
+    if teacher_id is not None:
+        teacher = session.get(Teacher, teacher_id)
+        name = teacher.name if teacher else abort(404)
+    elif class_id is not None:
+        class_ = session.get(Class, class_id)
+        name = class_.name if class_ else abort(404)
+    version_id = request.args.get('version', type=int)
+    if version_id is not None and not admin_user():
+        abort(403)  # unpublished drafts and old versions are for admins only
+    chunks = export(timetable_rows(session, class_id, teacher_id, version_id=version_id), fmt, start, name)
+    # No Content-Length, so the response goes out chunked as it is produced
+    return Response(stream_with_context(chunks), mimetype=MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=timetable.{fmt}'})
+
+def admin_user():
+    """The logged-in user if they are an admin, else None."""
+    user = current_user()
+    return user if user and user.is_admin() else None
+
+@app.route('/timetable/versions')
+def timetable_versions():
+    if not admin_user():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    versions = (session.query(TimetableVersion).options(joinedload(TimetableVersion.user))
+                .order_by(TimetableVersion.id.desc()).limit(DIRECTORY_PAGE_SIZE).all())
+    return render_template('versions.html', versions=versions, published=published_version_id(session))
+
+@app.route('/timetable/versions/<int:version_id>/publish', methods=['POST'])
+def publish_timetable_version(version_id):
+    if not admin_user():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    try:
+        publish_version(session, version_id)
+        flash(f'Timetable version {version_id} published.', 'success')
+    except ValueError as exc:
+        flash(str(exc), 'danger')
+    return redirect(url_for('timetable_versions'))
+
+@app.route('/timetable/rollback', methods=['POST'])
+def rollback_timetable_route():
+    if not admin_user():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    try:
+        version = rollback_timetable(session)
+        flash(f'Rolled back to timetable version {version.id}.', 'success')
+    except ValueError as exc:
+        flash(str(exc), 'danger')
+    return redirect(url_for('timetable_versions'))
+
+@app.route('/timetable/versions/<int:old_id>/diff/<int:new_id>')
+def timetable_diff(old_id, new_id):
+    if not admin_user():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    return render_template('version_diff.html', old_id=old_id, new_id=new_id,
+                           changes=diff_versions(session, old_id, new_id))
+
+@app.route('/timetable/versions/<int:old_id>/diff/<int:new_id>.json')
+def timetable_diff_json(old_id, new_id):
+    if not admin_user():
+        abort(403)
+    return jsonify(old=old_id, new=new_id, changes=diff_versions(session, old_id, new_id))
+
+@app.route('/metrics')
+def metrics():
+    cache = occupancy_cache.stats()
+    extra = [
+        ('scheduler_occupancy_cache_hits_total', 'counter', 'Occupancy cache hits.', cache['hits']),
+        ('scheduler_occupancy_cache_misses_total', 'counter', 'Occupancy cache misses.', cache['misses']),
+        ('scheduler_occupancy_cache_invalidations_total', 'counter', 'Occupancy cache invalidations.',
+         cache['invalidations']),
+        ('scheduler_occupancy_cache_entries', 'gauge', 'Slots held in the occupancy cache.', cache['size']),
+    ]
+    return Response(instrumentation.render_metrics(extra), mimetype='text/plain; version=0.0.4')
+
+@app.route('/find_rooms', methods=['GET', 'POST'])
+def find_rooms_route():
+    available = []
+    if request.method == 'POST':
+        day = request.form['day']
+        start = request.form['start_time']
+        end = request.form['end_time']
+        date = request.form.get('date') or None
+        min_capacity = request.form.get('min_capacity', type=int)
+        available = find_available_rooms(session, day, start, end, date=date, min_capacity=min_capacity)
+    return render_template('find_rooms.html', available=available)
+
+@app.route('/reschedule', methods=['GET', 'POST'])
+def reschedule_route():
+    options = []
+    if request.method == 'POST':
+        class_id = int(request.form['class_id'])
+        course_id = int(request.form['course_id'])
+        options = suggest_reschedule_options(session, class_id, course_id)
+    return render_template('reschedule.html', classes=get_classes(), courses=get_courses(), options=options)
+
+@app.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        confirm_password = request.form['confirm_password']
+        if password != confirm_password:
+            flash('Passwords do not match.', 'danger')
+            return render_template('register.html')
+        if len(password) < 6:
+            flash('Password must be at least 6 characters.', 'danger')
+            return render_template('register.html')
+        user = User(username=username)
+        user.set_password(password)
+        try:
+            session.add(user)
+            session.commit()
+            flash('Registration successful! Please log in.', 'success')
+            return redirect(url_for('login'))
+        except IntegrityError:
+            session.rollback()
+            flash('Username already exists.', 'danger')
+            return render_template('register.html')
+    return render_template('register.html')
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        user = session.query(User).filter_by(username=username).first()
+        if user and user.check_password(password):
+            if user.needs_rehash():
+                # Upgrade the stored hash to the configured method and cost
+                user.set_password(password)
+                session.commit()
+            flask_session['user_id'] = user.id
+            flash('Login successful!', 'success')
+            return redirect(url_for('index'))
+        else:
+            flash('Invalid username or password.', 'danger')
+            return render_template('login.html')
+    return render_template('login.html')
+
+@app.route('/logout')
+def logout():
+    flask_session.pop('user_id', None)
+    flash('Logged out successfully.', 'success')
+    return redirect(url_for('login'))
+
+@app.route('/cancel_class', methods=['GET', 'POST'])
+def cancel_class():
+    if request.method == 'POST':
+        class_id = request.form.get('class_id')
+        course_id = request.form.get('course_id')
+        date = request.form.get('date')
+        reason = request.form.get('reason')
+        if all([class_id, course_id, date]):
+            user = current_user()
+            try:
+                record_cancellation(session, int(class_id), int(course_id), date, reason, user.id if user else None)
+                flash('Class cancelled successfully.', 'success')
+                return redirect(url_for('index'))
+            except ValueError as exc:
+                flash(str(exc), 'danger')
+        else:
+            flash('Please fill out all fields.', 'danger')
+    return render_template('cancel_class.html', classes=get_classes(), courses=get_courses())
+
+@app.route('/change_room', methods=['GET', 'POST'])
+def change_room():
+    if request.method == 'POST':
+        class_id = request.form.get('class_id')
+        course_id = request.form.get('course_id')
+        new_room_id = request.form.get('new_room_id')
+        date = request.form.get('date')
+        reason = request.form.get('reason')
+        if all([class_id, course_id, new_room_id, date]):
+            user = current_user()
+            try:
+                record_room_change(session, int(class_id), int(course_id), int(new_room_id), date, reason,
+                                   user.id if user else None)
+                flash('Room changed successfully.', 'success')
+                return redirect(url_for('index'))
+            except ValueError as exc:
+                flash(str(exc), 'danger')
+        else:
+            flash('Please fill out all fields.', 'danger')
+    available_rooms = get_classrooms()  # Get all rooms initially
+    return render_template('change_room.html', classes=get_classes(), courses=get_courses(), available_rooms=available_rooms)
+
+@app.route('/teachers')
+def teachers():
+    rows, next_after = keyset_page(session.query(Teacher), Teacher.id, request.args.get('after', type=int),
+                                   DIRECTORY_PAGE_SIZE)
+    return render_template('teachers.html', teachers=rows, next_after=next_after,
+                           paged=request.args.get('after') is not None)
+
+@app.route('/admin', methods=['GET', 'POST'])
+def admin_route():
+    if 'user_id' not in flask_session:
+        flash('Please log in first.', 'danger')
+        return redirect(url_for('login'))
+    user = current_user()
+    if not user or not user.is_admin():
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+        
+    if request.method == 'POST':
+        target_user_id = request.form.get('user_id')
+        action = request.form.get('action')
+        if target_user_id and action == 'toggle_admin':
+            target_user = session.get(User, target_user_id)
+            if target_user:
+                target_user.is_admin_user = not target_user.is_admin_user
+                session.commit()
+                invalidate_users()
+                flash(f"Admin status updated for {target_user.username}.", 'success')
+            return redirect(url_for('admin_route'))
+            
+    users, next_after = keyset_page(session.query(User), User.id, request.args.get('after', type=int),
+                                    DIRECTORY_PAGE_SIZE)
+    return render_template('admin.html', users=users, next_after=next_after,
+                           paged=request.args.get('after') is not None)
+
+if __name__ == '__main__':
+    app.run(debug=True)
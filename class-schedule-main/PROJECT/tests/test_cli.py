@@ -0,0 +1,32 @@
+"""
+The `schedule` command and the importer and exporter command lines.
+"""
+import pytest
+
+from class_scheduler import cli, importer
+from class_scheduler.scheduler import get_session, Classroom
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    """A database named by SCHEDULER_DATABASE_URL, run from an empty directory."""
+    url = f"sqlite:///{tmp_path / 'env.db'}"
+    monkeypatch.setenv('SCHEDULER_DATABASE_URL', url)
+    workdir = tmp_path / 'work'
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    return url
+
+
+def test_import_and_export_use_the_database_from_the_environment(db_url, tmp_path, capsys):
+    rooms = tmp_path / 'rooms.csv'
+    rooms.write_text("name,capacity\nRoom 1,30\n")
+    assert importer.main(['classrooms', str(rooms)]) == 0
+    session = get_session(db_url)
+    assert [room.name for room in session.query(Classroom)] == ['Room 1']
+    session.close()
+
+    capsys.readouterr()
+    assert cli.main(['export', 'csv', '-']) == 0
+    assert capsys.readouterr().out.startswith('id,class,course,')
+    assert list((tmp_path / 'work').iterdir()) == []
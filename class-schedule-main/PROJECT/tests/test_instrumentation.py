@@ -0,0 +1,47 @@
+"""
+SQL tracking in instrumentation.py, including statements that fail.
+"""
+import copy
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from class_scheduler import instrumentation
+from class_scheduler.scheduler import add_classroom, get_engine, get_session
+
+
+@pytest.fixture
+def tracked(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'enabled', True)
+    engine = get_engine(f"sqlite:///{tmp_path / 'instrumentation.db'}")
+    instrumentation.track_sql(engine)
+    session = get_session(str(engine.url))
+    add_classroom(session, 'Room 1', 30)
+    yield engine, session
+    session.close()
+
+
+def fail(session, times):
+    for _ in range(times):
+        with pytest.raises(IntegrityError):
+            add_classroom(session, 'Room 1', 30)
+        session.rollback()
+
+
+def test_failed_statements_leave_nothing_on_the_pooled_connection(tracked):
+    engine, session = tracked
+    with engine.connect() as connection:
+        before = copy.deepcopy(connection.info)
+    fail(session, 5)
+    with engine.connect() as connection:
+        assert connection.info == before
+
+
+def test_statements_after_a_failure_are_counted(tracked):
+    engine, session = tracked
+    fail(session, 1)
+    with instrumentation.scope('test') as measured:
+        session.execute(text('SELECT 1'))
+    assert measured.statements == 1
+    assert 0 <= measured.sql_seconds < 5
@@ -0,0 +1,59 @@
+"""
+Room changes for one date: the original rooms recorded and the rooms they free.
+"""
+import datetime
+
+import pytest
+
+from class_scheduler.scheduler import (add_class, add_classroom, add_course, add_teacher, find_available_rooms,
+                                       get_session, publish_version, record_room_change, slot_columns, RoomChange,
+                                       Timetable, TimetableVersion)
+
+MONDAY = datetime.date(2026, 10, 19)
+
+
+@pytest.fixture
+def school(tmp_path):
+    """A 30-student class with two Monday maths lessons, in rooms A and B."""
+    session = get_session(f"sqlite:///{tmp_path / 'rooms.db'}")
+    rooms = {name: add_classroom(session, name, capacity).id
+             for name, capacity in (('A', 30), ('B', 30), ('C', 40), ('Small', 20))}
+    course = add_course(session, 'Maths')
+    teacher = add_teacher(session, 'Ada', 'Maths')
+    class_ = add_class(session, '7A', {course.id: teacher.id}, size=30)
+    version = TimetableVersion(source='generate')
+    session.add(version)
+    session.flush()
+    session.add_all([
+        Timetable(version_id=version.id, class_id=class_.id, course_id=course.id, teacher_id=teacher.id,
+                  classroom_id=rooms[room], **slot_columns('Monday', start, end))
+        for room, start, end in (('A', '09:00', '10:00'), ('B', '11:00', '12:00'))
+    ])
+    publish_version(session, version.id)
+    yield session, rooms, class_.id, course.id
+    session.close()
+
+
+def test_one_change_per_original_room(school):
+    session, rooms, class_id, course_id = school
+    changes = record_room_change(session, class_id, course_id, rooms['C'], MONDAY)
+    assert sorted(change.old_room_id for change in changes) == [rooms['A'], rooms['B']]
+    assert session.query(RoomChange).count() == 2
+
+
+def test_both_original_rooms_are_freed_on_that_date(school):
+    session, rooms, class_id, course_id = school
+    record_room_change(session, class_id, course_id, rooms['C'], MONDAY)
+    for start, end, freed in (('09:00', '10:00', 'A'), ('11:00', '12:00', 'B')):
+        free = {room.id for room in find_available_rooms(session, None, start, end, date=MONDAY)}
+        assert rooms[freed] in free
+        assert rooms['C'] not in free
+
+
+def test_rooms_too_small_or_unknown_are_rejected(school):
+    session, rooms, class_id, course_id = school
+    with pytest.raises(ValueError, match='too few'):
+        record_room_change(session, class_id, course_id, rooms['Small'], MONDAY)
+    with pytest.raises(ValueError, match='not found'):
+        record_room_change(session, class_id, course_id, 9999, MONDAY)
+    assert session.query(RoomChange).count() == 0
@@ -0,0 +1,58 @@
+"""
+The timetable page and print_timetable load the timetable with a fixed number
+of queries, however many classes there are (no query per class or per entry).
+"""
+import contextlib
+import io
+
+import pytest
+from sqlalchemy import event
+
+from class_scheduler.scheduler import (generate_timetable, get_session, invalidate_reference_data, print_timetable,
+                                       timetable_grid)
+from synthetic import days_and_slots, populate
+
+DAYS, TIME_SLOTS = days_and_slots(5, 8)
+
+
+def count_queries(session, call):
+    """Run call(session) and return the number of SQL statements it executed."""
+    invalidate_reference_data()
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            call(session)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return len(statements)
+
+
+@pytest.fixture
+def institution(tmp_path):
+    def build(classes):
+        session = get_session(f"sqlite:///{tmp_path / f'grid_{classes}.db'}")
+        populate(session, classes, 3, 12, 10, seed=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_timetable(session, DAYS, TIME_SLOTS, seed=1)
+        session.expire_all()
+        return session
+    return build
+
+
+@pytest.mark.parametrize('call', [
+    lambda session: timetable_grid(session, DAYS, TIME_SLOTS),
+    print_timetable,
+], ids=['timetable_grid', 'print_timetable'])
+def test_query_count_does_not_grow_with_classes(institution, call):
+    small, large = institution(3), institution(30)
+    try:
+        assert count_queries(small, call) == count_queries(large, call)
+    finally:
+        small.close()
+        large.close()
@@ -0,0 +1,112 @@
+"""
+Pages of the web app, rendered through Flask's test client on a fresh database.
+"""
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from class_scheduler.jobs import JobQueue
+from class_scheduler.scheduler import get_engine, get_session, Teacher, TimetableVersion, User
+from class_scheduler.webapp import app as webapp
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_url = f"sqlite:///{tmp_path / 'webapp.db'}"
+    monkeypatch.setattr(webapp, 'DATABASE_URL', db_url)
+    monkeypatch.setattr(webapp, 'generation_jobs', JobQueue(db_url, webapp.DAYS, webapp.TIME_SLOTS))
+    webapp.session.remove()
+    yield webapp.app.test_client(), db_url
+    webapp.session.remove()
+
+
+def log_in(client, db_url, is_admin):
+    session = get_session(db_url)
+    user = User(username='admin' if is_admin else 'student', is_admin_user=is_admin)
+    user.set_password('secret')
+    session.add(user)
+    session.commit()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user.id
+    session.close()
+
+
+def add_versions(db_url, count):
+    """Add count timetable versions, each created by another user."""
+    session = get_session(db_url)
+    start = session.query(User).count()
+    users = [User(username=f'user{start + i}', password_hash='-') for i in range(count)]
+    session.add_all(users)
+    session.flush()
+    session.add_all([TimetableVersion(source='generate', created_by=user.id) for user in users])
+    session.commit()
+    session.close()
+
+
+def count_queries(db_url, request):
+    """Statements run by request() on this thread; the generation worker polls on its own."""
+    statements = []
+    thread = threading.get_ident()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    engine = get_engine(db_url)
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('path', ['/', '/timetable', '/timetable/versions', '/teachers', '/admin'])
+def test_pages_render_for_an_admin(client, path):
+    client, db_url = client
+    log_in(client, db_url, is_admin=True)
+    response = client.get(path)
+    assert response.status_code == 200
+    assert b'Admin Settings' in response.data
+
+
+def test_timetable_page_shows_the_generate_form_to_admins_only(client):
+    client, db_url = client
+    log_in(client, db_url, is_admin=False)
+    response = client.get('/timetable')
+    assert response.status_code == 200
+    assert b'Generate Timetable' not in response.data
+    assert b'Admin Settings' not in response.data
+
+
+def test_versions_page_loads_the_users_with_the_versions(client):
+    client, db_url = client
+    log_in(client, db_url, is_admin=True)
+    add_versions(db_url, 1)
+    client.get('/timetable/versions')  # caches the logged-in user
+    one = count_queries(db_url, lambda: client.get('/timetable/versions'))
+    add_versions(db_url, 5)
+    assert count_queries(db_url, lambda: client.get('/timetable/versions')) == one
+
+
+@pytest.mark.parametrize('limit', ['0', '-2', 'three'])
+def test_teacher_period_limits_below_one_are_rejected(client, limit):
+    client, db_url = client
+    client.post('/add_teacher', data={'name': 'Ada', 'subject': 'Maths', 'max_daily_periods': limit})
+    with client.session_transaction() as flask_session:
+        assert flask_session['_flashes'] == [('danger', f"Invalid max daily periods {limit!r}.")]
+    session = get_session(db_url)
+    assert session.query(Teacher).count() == 0
+    session.close()
+
+
+def test_teacher_period_limits_are_optional(client):
+    client, db_url = client
+    client.post('/add_teacher', data={'name': 'Ada', 'subject': 'Maths', 'max_daily_periods': '',
+                                      'max_weekly_periods': '12'})
+    session = get_session(db_url)
+    teacher = session.query(Teacher).one()
+    assert (teacher.max_daily_periods, teacher.max_weekly_periods) == (None, 12)
+    session.close()